@@ -1,20 +1,99 @@
 import os
 import csv
+import argparse
+from queue import Queue, Empty
 from dotenv import load_dotenv
 from logs import logger
-from scraping.scraper_dt import ScrapingDilutionTracker
+from scraping.scraper_dt import ScrapingDilutionTracker, get_blocked_urls
 from database.db import Database
+from database.writer import DatabaseWriter
+from runner import scrape_ticker, log_writer_errors, check_browser, \
+    requeue_lost_tickers, WorkerPool
+from timing import timer
+from scraping.profiler import CommandProfiler
+from scraping.replay import PageRecorder, ReplayServer
+from scraping.watchdog import MemoryWatchdog
+from scraping import web_scraping
 load_dotenv()
 
 DEBUG = os.getenv("DEBUG") == "True"
 DEBUG_TRICKERS = int(os.getenv("DEBUG_TRICKERS"))
 CHROME_FOLDER = os.getenv('CHROME_FOLDER')
+NONCOMPLIANT_TTL = int(os.getenv("NONCOMPLIANT_TTL", "0"))
+WORKERS = int(os.getenv("WORKERS", "1"))
+MIN_INTERVAL = float(os.getenv("MIN_INTERVAL", "0"))
+WRITE_BEHIND = int(os.getenv("DB_WRITE_BEHIND", "0"))
+INCREMENTAL = os.getenv("INCREMENTAL") == "True"
+TIMING_FOLDER = os.getenv("TIMING_FOLDER", "reports")
+PROFILE_COMMANDS = os.getenv("PROFILE_COMMANDS") == "True"
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES") == "True"
+ALLOWED_URLS = [url.strip() for url in os.getenv("ALLOWED_URLS", "").split(",") if url.strip()]
+BLOCKED_URLS = [url.strip() for url in os.getenv("BLOCKED_URLS", "").split(",") if url.strip()]
+RECYCLE_TICKERS = int(os.getenv("RECYCLE_TICKERS", "0"))
+RECYCLE_RSS_MB = float(os.getenv("RECYCLE_RSS_MB", "0"))
+RECYCLE_HEAP_MB = float(os.getenv("RECYCLE_HEAP_MB", "0"))
+
+# Webdriver commands profiler (shared by all workers)
+profiler = CommandProfiler() if PROFILE_COMMANDS else None
+
+def save_timing_report ():
+    """ Save json report and show summary of the run timing and
+        webdriver commands (if enabled)
+    """
+
+    report_path = timer.save_report(TIMING_FOLDER)
+    if report_path:
+        timer.log_summary(logger)
+        logger.info(f'Timing report saved in {report_path}')
+
+    if profiler:
+        profiler.log_summary(logger)
+        folded_name = f"commands_{timer.started.strftime('%Y%m%d_%H%M%S')}.folded"
+        folded_path = os.path.join(TIMING_FOLDER, folded_name)
+        profiler.save_folded(folded_path)
+        logger.info(f'Webdriver commands flame graph data saved in {folded_path}')
+
+def record_pages (tickers: list, fixtures_folder: str):
+    """ Save the pages of the tickers to scrape them offline (replay mode)
+
+    Args:
+        tickers (list): tickers to record (alias, key)
+        fixtures_folder (str): folder to save the pages
+    """
+
+    scraper = ScrapingDilutionTracker(CHROME_FOLDER)
+    if not scraper.login():
+        logger.error('Login failed. Close the program, open chrome, login manually and try again')
+        quit ()
+
+    recorder = PageRecorder(fixtures_folder)
+    try:
+        recorder.record_login(scraper)
+        recorder.record_noncompliant(scraper)
+        for tricker_name, tricker_key in tickers:
+            logger.info (f"Recording {tricker_name}...")
+            try:
+                recorder.record_company(scraper, tricker_key)
+            except Exception as err:
+                logger.error(f'Error recording {tricker_name}: {err}')
+    finally:
+        scraper.end_browser()
+
+    logger.info(f'Pages saved in {fixtures_folder}')
 
 def main ():
     
-    # Connect to database
-    database = Database()
-    
+    # Read command line options
+    parser = argparse.ArgumentParser(description="Scrape dilution tracker tickers")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the last run (saved with DB_CHECKPOINTS=True or --resume), "
+                             "skipping the tickers and sections already saved")
+    parser.add_argument("--record", metavar="FOLDER",
+                        help="save the pages of the tickers in a fixtures folder (without scraping)")
+    parser.add_argument("--replay", metavar="FOLDER",
+                        help="scrape the pages saved in a fixtures folder (offline)")
+    args = parser.parse_args()
+
     # Validate chrome folder
     if CHROME_FOLDER is None or not os.path.isdir(CHROME_FOLDER):
         logger.error('CHROME_FOLDER not found env variable is not set')
@@ -32,8 +111,82 @@ def main ():
         reader = csv.reader(file)
         tickers = list(reader)
         
+    # Only scrape some tickers in debug mode
+    if DEBUG:
+        tickers = tickers[:DEBUG_TRICKERS]
+
+    # Only save pages
+    if args.record:
+        record_pages(tickers, args.record)
+        return
+
+    # Connect to database
+    database = Database()
+
+    # Resumed runs save checkpoints too (to resume them again)
+    if args.resume:
+        Database.checkpoints = True
+
+    # Tables of the incremental mode and checkpoints
+    if INCREMENTAL or Database.checkpoints:
+        database.create_run_tables()
+
+    # Last update of each ticker, to skip tickers without changes
+    last_updates = None
+    if INCREMENTAL:
+        last_updates = database.get_tickers_updates()
+        logger.info(f'Incremental mode: {len(last_updates)} tickers saved before')
+
+    # Last filings saved of each company, to scrape only new filings
+    last_filings = database.get_last_filings()
+
+    # Sections saved of each ticker in the last run
+    checkpoint = None
+    if args.resume:
+        run_started, checkpoint = database.get_checkpoint()
+        if run_started:
+            Database.run_started = run_started
+            logger.info(f'Resuming run from {run_started}: {len(checkpoint)} tickers saved before')
+        else:
+            logger.info('No run to resume, starting a new run')
+
+    # Serve recorded pages
+    replay_server = None
+    if args.replay:
+        replay_server = ReplayServer(args.replay)
+        replay_server.start()
+        logger.info(f'Replaying pages from {args.replay} in {replay_server.url}')
+
+    # Images, fonts and trackers to not load
+    blocked_urls = []
+    if BLOCK_RESOURCES:
+        blocked_urls = get_blocked_urls(ALLOWED_URLS, BLOCKED_URLS)
+
+    # Chrome processes memory is only available with psutil
+    if RECYCLE_RSS_MB and not web_scraping.psutil:
+        logger.warning('psutil not installed: RECYCLE_RSS_MB ignored (pip install psutil)')
+
+    # Scrape with multiple chrome instances
+    if WORKERS > 1 and not replay_server:
+        pool = WorkerPool(CHROME_FOLDER, WORKERS, NONCOMPLIANT_TTL, MIN_INTERVAL,
+                          WRITE_BEHIND, last_updates, checkpoint, last_filings,
+                          profiler, blocked_urls, RECYCLE_TICKERS, RECYCLE_RSS_MB,
+                          RECYCLE_HEAP_MB)
+        try:
+            pool.run(tickers)
+        finally:
+            save_timing_report()
+        return
+
     # Connect to dilution tracker
-    scraper = ScrapingDilutionTracker(CHROME_FOLDER)
+    scraper = ScrapingDilutionTracker(
+        CHROME_FOLDER,
+        NONCOMPLIANT_TTL,
+        profiler=profiler,
+        blocked_urls=blocked_urls,
+    )
+    if replay_server:
+        scraper.pages.update(replay_server.pages)
     
     # End if login failed
     is_logged = scraper.login()
@@ -43,69 +196,46 @@ def main ():
         logger.error('Login failed. Close the program, open chrome, login manually and try again')
         quit ()
     
-    tricker_num = 0
-    for tricker_name, tricker_key in tickers:
-        
-        tricker_num += 1
-                
-        logger.info (f"\n>>> Scraping {tricker_name}...")
-        
-        # Load and get main data 
-        scraper.load_company(tricker_key)
-        logger.info("scraping premarket data...")
-        premarket_data = scraper.get_premarket_data()
-        
-        # Validate data found
-        if not premarket_data["found"]:
-            logger.info (f"\t* {premarket_data['dilution_data']}")
-            continue
-        
-        database.save_premarket_data (premarket_data)
-            
-        # Scraper secondary data
-        logger.info("scraping historical data...")
-        try:
-            historical_data = scraper.get_historical_data()
-            database.save_historical_data (historical_data)
-        except Exception as err:
-            print ("\thistorical data not found")
-                    
-        logger.info("scraping cash data...")
-        try:
-            cash_data = scraper.get_cash_data()
-            database.save_cash_data (cash_data)
-        except Exception as err:
-            print ("\tcash data not found")
-        
-        logger.info("scraping extra data...")
-        extra_data = scraper.get_extra_data()
-        database.save_extra_data (extra_data)
-        
-        logger.info("scraping complete offering data...")
-        completed_offering_data = scraper.get_completed_offering_data()
-        database.save_completed_offering_data (completed_offering_data)
-        
-        logger.info("scraping news data...")
-        news_data = scraper.get_news_data()
-        database.save_news_data (news_data)
-        
-        logger.info("scraping holders data...")
-        holders_data = scraper.get_holders_data()
-        database.save_holders_data (holders_data)
-        
-        logger.info ("scraping filings data...")
-        filings_data = scraper.get_filings_data()
-        database.save_filings_data (filings_data)
-        
-        # Extract no complant data
-        logger.info ("Scraping noncompliant data...\n")
-        noncompliant_data = scraper.get_noncompliant_data (tricker_key.lower().strip())
-        database.save_noncompliant_data (noncompliant_data)
-                
-        # End in debug mode
-        if DEBUG and DEBUG_TRICKERS == tricker_num:
-            logger.info ("Debug mode: ending...")
-            break
+    # Save data in background while scraping (restarting chrome when needed)
+    writer = DatabaseWriter(database, WRITE_BEHIND)
+    watchdog = MemoryWatchdog(RECYCLE_TICKERS, RECYCLE_RSS_MB, RECYCLE_HEAP_MB)
+    tickers_queue = Queue()
+    for ticker in tickers:
+        tickers_queue.put(ticker)
+    requeued = set()
+    try:
+        while True:
+
+            try:
+                tricker_name, tricker_key = tickers_queue.get_nowait()
+            except Empty:
+
+                # Commit the last group (scrape again its tickers if it is lost)
+                writer.flush()
+                log_writer_errors(writer)
+                if requeue_lost_tickers(writer, tickers_queue, tickers, requeued):
+                    continue
+                break
+
+            with timer.span(tricker_name, "ticker", scraper.driver):
+                scrape_ticker(scraper, writer, tricker_name, tricker_key,
+                              last_updates, checkpoint, last_filings)
+            log_writer_errors(writer)
+            requeue_lost_tickers(writer, tickers_queue, tickers, requeued)
+            if not check_browser(scraper, watchdog, tricker_name):
+                break
+    finally:
+        # Save pending data and commit the last group
+        writer.close()
+        log_writer_errors(writer)
+        save_timing_report()
+
+    # Show time spent waiting pages
+    waits_count = sum(stats["count"] for stats in scraper.wait_stats.values())
+    wait_seconds = sum(stats["seconds"] for stats in scraper.wait_stats.values())
+    logger.info (f"Page waits: {waits_count} signals in {round(wait_seconds, 1)}s")
+    if watchdog.recycles:
+        logger.info (f"Chrome recycled {watchdog.recycles} times")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
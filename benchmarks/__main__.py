@@ -0,0 +1,105 @@
+import os
+import sys
+import argparse
+from benchmarks.results import save_results, load_results, compare_results
+
+current_folder = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(current_folder, "baseline.json")
+RESULTS_PATH = os.path.join(current_folder, "results", "latest.json")
+PARTS = ["extraction", "persistence", "end_to_end", "page_load"]
+
+
+def main ():
+
+    parser = argparse.ArgumentParser(description="Run performance benchmarks and compare with the baseline")
+    parser.add_argument("--parts", nargs="+", choices=PARTS, default=PARTS,
+                        help="benchmarks to run")
+    parser.add_argument("--fixtures", default=os.path.join(current_folder, "fixtures"),
+                        help="folder with the pages saved with --record (extraction and end to end)")
+    parser.add_argument("--tickers", nargs="*", default=[],
+                        help="tickers to use from fixtures (default all)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="runs of each benchmark")
+    parser.add_argument("--write-behind", type=int, default=0,
+                        help="max pending saves of the database writer thread (end to end)")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="max slowdown allowed from baseline (0.2 = 20%%)")
+    parser.add_argument("--output", default=RESULTS_PATH,
+                        help="results json file")
+    parser.add_argument("--baseline", default=BASELINE_PATH,
+                        help="baseline json file")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="save results as the new baseline")
+    args = parser.parse_args()
+
+    # Run benchmarks (imported only when used: chrome and mysql are optional)
+    results = {}
+    if "extraction" in args.parts:
+        from benchmarks import bench_extraction
+        extraction = bench_extraction.run(args.fixtures, args.tickers, args.repeat)
+        results.update(extraction)
+        for name, elements in extraction.items():
+            snapshot = extraction.get(name.replace(".elements", ""))
+            if not name.endswith(".get_premarket_data.elements") or not snapshot:
+                continue
+            ticker = name.split(".")[1]
+            saving = round(elements["median"] - snapshot["median"], 6)
+            print(f'Premarket data {ticker}: {elements["median"]}s by element, '
+                  f'{snapshot["median"]}s with snapshot ({saving}s saved per ticker)')
+        for name, scan in extraction.items():
+            lookup = extraction.get(name.replace("_scan", "_lookup"))
+            index = extraction.get("extraction.noncompliant_index")
+            if not name.endswith(".noncompliant_scan") or not lookup or not index:
+                continue
+            ticker = name.split(".")[1]
+            print(f'Noncompliant data {ticker}: {scan["median"]}s page scan per ticker, '
+                  f'{lookup["median"]}s index lookup (index loaded once per run in {index["median"]}s)')
+
+    if "persistence" in args.parts:
+        from benchmarks import bench_persistence
+        persistence = bench_persistence.run(args.repeat)
+        results.update(persistence)
+        for name, per_row in persistence.items():
+            batched = persistence.get(name.replace(".per_row", ""))
+            if not name.endswith(".per_row") or not batched:
+                continue
+            print(f'{name.replace(".per_row", "")}: {per_row["rows_per_sec"]} rows/s per row, '
+                  f'{batched["rows_per_sec"]} rows/s batched')
+
+    if "end_to_end" in args.parts:
+        from benchmarks import bench_end_to_end
+        results.update(bench_end_to_end.run(args.fixtures, args.tickers, args.repeat,
+                                            args.write_behind))
+
+    if "page_load" in args.parts:
+        from benchmarks import bench_page_load
+        page_load = bench_page_load.run(args.repeat)
+        results.update(page_load)
+        default, blocked = page_load["page_load.default"], page_load["page_load.blocked"]
+        print(f'Page load: {default["median"]}s ({default["js_heap_mb"]} MB js heap) loading all, '
+              f'{blocked["median"]}s ({blocked["js_heap_mb"]} MB js heap) blocking resources')
+
+    save_results(results, args.output)
+    print(f"Results saved in {args.output}")
+
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"Baseline saved in {args.baseline}")
+        return
+
+    # Compare with baseline
+    baseline = load_results(args.baseline)
+    comparison = compare_results(results, baseline, args.threshold)
+    for item in comparison:
+        change = "new" if item["change"] is None else f'{item["change"]:+.1%}'
+        flag = "  REGRESSION" if item["regression"] else ""
+        print(f'{item["name"]}: {item["median"]}s ({change}){flag}')
+
+    regressions = [item for item in comparison if item["regression"]]
+    if regressions:
+        print(f"{len(regressions)} regressions (more than {args.threshold:.0%} slower than baseline)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
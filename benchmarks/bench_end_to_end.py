@@ -0,0 +1,71 @@
+from database.db import Database
+from database.writer import DatabaseWriter
+from scraping.scraper_dt import ScrapingDilutionTracker
+from scraping.replay import ReplayServer
+from runner import scrape_ticker
+from benchmarks.results import measure
+from benchmarks.bench_extraction import get_fixtures_tickers
+
+
+def run(fixtures_folder: str, tickers: list = [], repeat: int = 3,
+        write_behind: int = 0) -> dict:
+    """ Measure the full scrape and save of each ticker against recorded
+        pages (headless chrome) and the database of the env variables.
+        Changes are rolled back after each run, except the new names of
+        dictionary tables (committed by the shared dictionary cache)
+
+    Args:
+        fixtures_folder (str): folder with the recorded pages
+        tickers (list, optional): tickers to use. Defaults to [] (all recorded).
+        repeat (int, optional): runs of each ticker. Defaults to 3.
+        write_behind (int, optional): max pending saves of the database
+            writer thread. Defaults to 0 (save synchronously).
+
+    Returns:
+        dict: results by benchmark name, like "end_to_end.aapl"
+    """
+
+    tickers = tickers or get_fixtures_tickers(fixtures_folder)
+
+    server = ReplayServer(fixtures_folder)
+    server.start()
+    scraper = ScrapingDilutionTracker("", start_killing=False, headless=True)
+    scraper.pages.update(server.pages)
+
+    # Never commit the benchmark tickers (group is discarded after each run)
+    database = Database()
+    database.group_size = repeat * len(tickers) + 1
+    writer = DatabaseWriter(database, write_behind)
+
+    def teardown():
+        database.rollback()
+        database.close()
+        database.group_tickers = 0
+        database.group_keys = []
+        for error in writer.get_errors():
+            print(f"end_to_end save failed: {error}")
+
+    results = {}
+    try:
+        for ticker in tickers:
+
+            # Scrape and wait until all the data is saved
+            def scrape():
+                scrape_ticker(scraper, writer, ticker, ticker)
+                writer.wait()
+
+            # Skip failed tickers (always discard their changes)
+            name = f"end_to_end.{ticker}"
+            try:
+                results[name] = measure(scrape, repeat, teardown=teardown)
+            except Exception as err:
+                print(f"{name} failed: {err}")
+                writer.wait()
+                teardown()
+
+    finally:
+        writer.close()
+        scraper.end_browser()
+        server.stop()
+
+    return results
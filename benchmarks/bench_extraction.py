@@ -0,0 +1,157 @@
+import os
+from datetime import datetime as dt
+from scraping.scraper_dt import ScrapingDilutionTracker
+from scraping.replay import ReplayServer
+from benchmarks.results import measure
+
+# Extraction methods of the company page
+METHODS = [
+    "get_premarket_data",
+    "get_historical_data",
+    "get_cash_data",
+    "get_extra_data",
+    "get_completed_offering_data",
+    "get_news_data",
+    "get_holders_data",
+    "get_filings_data",
+]
+
+
+def get_fixtures_tickers(fixtures_folder: str) -> list:
+    """ Get tickers recorded in a fixtures folder
+
+    Args:
+        fixtures_folder (str): folder with the recorded pages
+
+    Returns:
+        list: tickers
+    """
+
+    companies_folder = os.path.join(fixtures_folder, "companies")
+    if not os.path.isdir(companies_folder):
+        return []
+
+    return sorted(os.listdir(companies_folder))
+
+
+def scan_noncompliant_data(scraper: ScrapingDilutionTracker, tricker: str) -> list:
+    """ Get the noncompliant data of a ticker scanning the nasdaq page row by
+        row (get_noncompliant_data before the index, without its fixed 5s wait)
+
+    Args:
+        scraper (ScrapingDilutionTracker): scraper instance
+        tricker (str): company tricker
+
+    Returns:
+        list: no complaint data (same structure as get_noncompliant_data)
+    """
+
+    selectors = {
+        "dispay_btn": 'th [type="button"]',
+        "rows": '.rgMasterTable tbody tr',
+        "company": 'td[colspan="4"] p',
+        "tricker": 'td:nth-child(2)',
+        "deficiency": 'td:nth-child(3)',
+        "market": 'td:nth-child(4)',
+        "notification_date": 'td:nth-child(5)',
+    }
+
+    scraper.set_page(scraper.pages["noncompliant"])
+    scraper.click_js(selectors["dispay_btn"])
+    scraper.wait_ready(selectors["rows"], time_out=20)
+
+    rows_num = len(scraper.get_elems(selectors["rows"]))
+    current_company = ""
+    data = []
+    for index in range(rows_num):
+
+        selector_row = f'{selectors["rows"]}:nth-child({index+1})'
+
+        company = scraper.get_text(f'{selector_row} {selectors["company"]}')
+        if company:
+            current_company = company
+            continue
+
+        current_tricker = scraper.get_text(f'{selector_row} {selectors["tricker"]}').lower().strip()
+        if tricker not in current_tricker:
+            continue
+
+        notification_date = scraper.get_text(f'{selector_row} {selectors["notification_date"]}')
+        data.append({
+            "company": current_company,
+            "deficiency": scraper.get_text(f'{selector_row} {selectors["deficiency"]}'),
+            "market": scraper.get_text(f'{selector_row} {selectors["market"]}'),
+            "notification_date": dt.strptime(notification_date, "%m/%d/%Y"),
+        })
+
+    return data
+
+
+def run(fixtures_folder: str, tickers: list = [], repeat: int = 5) -> dict:
+    """ Measure each extraction method against recorded pages (headless chrome)
+
+    Args:
+        fixtures_folder (str): folder with the recorded pages
+        tickers (list, optional): tickers to use. Defaults to [] (all recorded).
+        repeat (int, optional): runs of each method. Defaults to 5.
+
+    Returns:
+        dict: results by benchmark name, like "extraction.aapl.get_news_data"
+            ("extraction.aapl.get_premarket_data.elements" for the premarket
+            data without snapshot, "extraction.aapl.noncompliant_scan" and
+            "extraction.aapl.noncompliant_lookup" for the old page scan and
+            the index lookup of each ticker)
+    """
+
+    tickers = tickers or get_fixtures_tickers(fixtures_folder)
+
+    server = ReplayServer(fixtures_folder)
+    server.start()
+    scraper = ScrapingDilutionTracker("", start_killing=False, headless=True)
+    scraper.pages.update(server.pages)
+
+    results = {}
+    try:
+
+        for ticker in tickers:
+
+            # Measure each method from a new loaded page (tabs methods click their tab)
+            for method in METHODS:
+                name = f"extraction.{ticker}.{method}"
+                try:
+                    results[name] = measure(getattr(scraper, method), repeat,
+                                            lambda: scraper.load_company(ticker))
+                except Exception as err:
+                    print(f"{name} failed: {err}")
+
+            # Premarket data with one webdriver call per element (before
+            # the snapshot script), to compare with get_premarket_data
+            name = f"extraction.{ticker}.get_premarket_data.elements"
+            try:
+                results[name] = measure(lambda: scraper.get_premarket_data(snapshot=False),
+                                        repeat, lambda: scraper.load_company(ticker))
+            except Exception as err:
+                print(f"{name} failed: {err}")
+
+        # Nasdaq noncompliant list (loaded once per run)
+        results["extraction.noncompliant_index"] = measure(
+            scraper.__load_noncompliant_index__, repeat
+        )
+
+        # Noncompliant data of each ticker: page scan vs index lookup
+        scraper.get_noncompliant_data("")
+        for ticker in tickers:
+            for name, func in [
+                (f"extraction.{ticker}.noncompliant_scan", scan_noncompliant_data),
+                (f"extraction.{ticker}.noncompliant_lookup", ScrapingDilutionTracker.get_noncompliant_data),
+            ]:
+                try:
+                    results[name] = measure(lambda: func(scraper, ticker), repeat)
+                except Exception as err:
+                    print(f"{name} failed: {err}")
+
+    finally:
+        scraper.end_browser()
+        server.stop()
+
+    return results
@@ -0,0 +1,129 @@
+import base64
+import threading
+from time import sleep
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from scraping.web_scraping import WebScraping
+from scraping.scraper_dt import get_blocked_urls
+from benchmarks.results import measure
+
+# 1x1 png image
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+# Local stand-in of the third party scripts (blocked by the extra pattern)
+TRACKER_PATTERN = "*/tracker/*"
+
+
+def get_page(images_num: int) -> str:
+    """ Get test page, with images, web fonts and tracker scripts
+
+    Args:
+        images_num (int): images in page
+
+    Returns:
+        str: page html
+    """
+
+    images = "".join(f'<img src="/assets/image_{index}.png">' for index in range(images_num))
+    fonts = "".join(
+        f'@font-face {{font-family: font{index}; src: url("/assets/font_{index}.woff2")}} '
+        f'.font{index} {{font-family: font{index}}}'
+        for index in range(4)
+    )
+    texts = "".join(f'<p class="font{index}">text</p>' for index in range(4))
+    trackers = "".join(f'<script src="/tracker/script_{index}.js"></script>' for index in range(3))
+
+    return f"<html><head><style>{fonts}</style>{trackers}</head><body><h1>test</h1>{texts}{images}</body></html>"
+
+
+def start_server(images_num: int, asset_delay: float) -> ThreadingHTTPServer:
+    """ Start local server of the test page (assets with simulated latency)
+
+    Args:
+        images_num (int): images in page
+        asset_delay (float): seconds to wait before sending each asset
+
+    Returns:
+        ThreadingHTTPServer: running server
+    """
+
+    page = get_page(images_num).encode("utf-8")
+
+    class PageHandler (BaseHTTPRequestHandler):
+
+        def do_GET(self):
+
+            if self.path == "/":
+                body, content_type = page, "text/html"
+            else:
+                sleep(asset_delay)
+                if self.path.endswith(".png"):
+                    body, content_type = PNG, "image/png"
+                elif self.path.endswith(".js"):
+                    body, content_type = b"window.tracked = true", "application/javascript"
+                else:
+                    body, content_type = b"\0" * 20000, "font/woff2"
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, name="page_load_server", daemon=True).start()
+
+    return server
+
+
+def run(repeat: int = 5, images_num: int = 40, asset_delay: float = 0.05) -> dict:
+    """ Measure page load time and js heap, loading all resources and with
+        the resources blocking profile (headless chrome, local server)
+
+    Args:
+        repeat (int, optional): loads of each profile. Defaults to 5.
+        images_num (int, optional): images in the test page. Defaults to 40.
+        asset_delay (float, optional): simulated latency of each asset.
+            Defaults to 0.05.
+
+    Returns:
+        dict: results by benchmark name ("page_load.default", "page_load.blocked")
+    """
+
+    server = start_server(images_num, asset_delay)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    scraper = WebScraping(headless=True)
+    scraper.driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": True})
+    scraper.driver.execute_cdp_cmd("Performance.enable", {})
+
+    profiles = {
+        "default": [],
+        "blocked": get_blocked_urls(extra_urls=[TRACKER_PATTERN]),
+    }
+
+    results = {}
+    try:
+        for profile_name, blocked_urls in profiles.items():
+
+            scraper.block_urls(blocked_urls)
+            result = measure(lambda: scraper.driver.get(url), repeat,
+                             setup=lambda: scraper.driver.get("about:blank"))
+
+            # Js heap after the last load
+            metrics = scraper.driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+            metrics = {metric["name"]: metric["value"] for metric in metrics}
+            result["js_heap_mb"] = round(metrics.get("JSHeapUsedSize", 0) / 1024 / 1024, 2)
+
+            results[f"page_load.{profile_name}"] = result
+
+    finally:
+        scraper.end_browser()
+        server.shutdown()
+
+    return results
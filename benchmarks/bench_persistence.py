@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta
+from database.db import Database
+from benchmarks.results import measure
+
+# Rows of each synthetic payload
+ROWS_SIZES = [10, 100, 1000]
+
+# Few names for dictionary tables (to not fill them with benchmark data).
+# They are committed by the dictionary cache, and stay in the database
+NAMES = [f"benchmark {index}" for index in range(5)]
+
+
+def get_premarket_data() -> dict:
+    """ Get synthetic premarket data
+
+    Returns:
+        dict: premarket data (same structure as get_premarket_data)
+    """
+
+    return {
+        "found": True,
+        "name": "benchmark company",
+        "sector": NAMES[0],
+        "industry": NAMES[1],
+        "mkt_cap": 12.5,
+        "float_cap": 8.1,
+        "est_cash_sh": 0.45,
+        "t25_inst_own": 12.3,
+        "si": 4.2,
+        "description_company": "benchmark description",
+        "dilution_data": NAMES[2],
+        "overall_risk": NAMES[3],
+        "offering_abillity": NAMES[3],
+        "dilution_amt_ex_shelf": NAMES[4],
+        "historical": NAMES[4],
+        "cash_need": NAMES[3],
+        "out_take": "benchmark take",
+        "update_info": "benchmark update",
+        "header_hash": "0" * 40,
+    }
+
+
+def get_payloads(rows_num: int) -> dict:
+    """ Get synthetic data of each save method
+
+    Args:
+        rows_num (int): rows of each list
+
+    Returns:
+        dict: data by save method name
+    """
+
+    today = datetime.now().replace(microsecond=0)
+    dates = [today - timedelta(days=index) for index in range(rows_num)]
+    columns_data = [
+        {"position": index, "date": date, "hos": float(index)}
+        for index, date in enumerate(dates)
+    ]
+
+    return {
+        "save_historical_data": {
+            "columns_data": columns_data,
+            "atm": 1.0,
+            "warrant": 2.0,
+            "convertible_preferred": 3.0,
+            "convertible_note": 4.0,
+            "equality_line": 5.0,
+            "s1_offering": 6.0,
+        },
+        "save_cash_data": {
+            "columns_data": columns_data,
+            "prorated_operating": 1.0,
+            "capital_rise": 2.0,
+            "current_cash_sheet": 3.0,
+            "cash_description": "benchmark cash",
+            "months_of_cash": 4.0,
+            "quarterly_cash_burn_m": 5.0,
+            "current_cash_m": 6.0,
+            "m": 7.0,
+        },
+        "save_extra_data": [
+            {
+                "origin": NAMES[index % 5],
+                "status": NAMES[(index + 1) % 5],
+                "name": NAMES[(index + 2) % 5],
+                "title": f"title {index}",
+                "value": f"value {index}",
+                "position": index,
+            }
+            for index in range(rows_num)
+        ],
+        "save_completed_offering_data": [
+            {
+                "type": NAMES[index % 5],
+                "method": NAMES[(index + 1) % 5],
+                "share_equivalent": index * 1000,
+                "price": 1.5,
+                "warrants": index * 100,
+                "offering_amt": index * 1500,
+                "bank": "benchmark bank",
+                "investors": NAMES[(index + 2) % 5],
+                "date": date,
+            }
+            for index, date in enumerate(dates)
+        ],
+        "save_news_data": [
+            {
+                "time_ago_number": index,
+                "time_ago_label": "days",
+                "datetime": date,
+                "headline": f"headline {index}",
+                "link": f"https://example.com/benchmark/news/{index}",
+            }
+            for index, date in enumerate(dates)
+        ],
+        "save_holders_data": [
+            {
+                "institution_name": NAMES[index % 5],
+                "percentage": 1.5,
+                "shares": index * 1000,
+                "change": 0.5,
+                "form": NAMES[(index + 1) % 5],
+                "efective": date,
+                "field": date,
+            }
+            for index, date in enumerate(dates)
+        ],
+        "save_filings_data": [
+            {
+                "name": NAMES[index % 5],
+                "headline": f"filing {index}",
+                "date": date,
+                "link": f"https://example.com/benchmark/filings/{index}",
+            }
+            for index, date in enumerate(dates)
+        ],
+        "save_noncompliant_data": [
+            {
+                "company": NAMES[index % 5],
+                "deficiency": NAMES[(index + 1) % 5],
+                "market": NAMES[(index + 2) % 5],
+                "notification_date": date,
+            }
+            for index, date in enumerate(dates)
+        ],
+    }
+
+
+def run(repeat: int = 5) -> dict:
+    """ Measure each save method with synthetic payloads, against the
+        database of the env variables (use a local benchmark database).
+        Each run is rolled back, except the NAMES rows of the dictionary
+        tables (inserted and committed once by the shared dictionary cache)
+
+    Args:
+        repeat (int, optional): runs of each method. Defaults to 5.
+
+    Returns:
+        dict: results by benchmark name, like "persistence.save_news_data.100"
+            ("persistence.save_news_data.100.per_row" for the inserts
+            without batching), with the rows saved per second
+    """
+
+    database = Database()
+    premarket_data = get_premarket_data()
+
+    def setup():
+        database.begin_ticker()
+        database.save_premarket_data(premarket_data)
+
+    def teardown():
+        database.abort_ticker()
+
+    # One statement per row (before batching), and batched inserts
+    batch_sizes = {
+        ".per_row": 1,
+        "": database.batch_size,
+    }
+
+    results = {}
+    for rows_num in ROWS_SIZES:
+        for method, payload in get_payloads(rows_num).items():
+
+            def save():
+                getattr(database, method)(payload)
+
+            for suffix, batch_size in batch_sizes.items():
+
+                # Measure inside a ticker transaction, and discard changes
+                database.batch_size = batch_size
+                name = f"persistence.{method}.{rows_num}{suffix}"
+                result = measure(save, repeat, setup, teardown)
+                result["rows_per_sec"] = round(rows_num / result["median"], 1) if result["median"] else None
+                results[name] = result
+
+    database.batch_size = batch_sizes[""]
+
+    return results
@@ -0,0 +1,129 @@
+import os
+import json
+import statistics
+from time import perf_counter
+from datetime import datetime
+
+
+def measure(func, repeat: int = 5, setup=None, teardown=None) -> dict:
+    """ Run a function many times and get its durations
+
+    Args:
+        func (callable): function to measure
+        repeat (int, optional): runs. Defaults to 5.
+        setup (callable, optional): function to run before each run
+            (not measured). Defaults to None.
+        teardown (callable, optional): function to run after each run
+            (not measured). Defaults to None.
+
+    Returns:
+        dict: durations summary
+
+        Structure:
+        {
+            "runs": int,
+            "median": float,
+            "min": float,
+            "max": float,
+        }
+    """
+
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = perf_counter()
+        func()
+        durations.append(perf_counter() - start)
+        if teardown:
+            teardown()
+
+    return {
+        "runs": repeat,
+        "median": round(statistics.median(durations), 6),
+        "min": round(min(durations), 6),
+        "max": round(max(durations), 6),
+    }
+
+
+def save_results(results: dict, file_path: str):
+    """ Save benchmark results in json file
+
+    Args:
+        results (dict): results by benchmark name
+        file_path (str): json file path
+    """
+
+    folder = os.path.dirname(file_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    data = {
+        "created": datetime.now().replace(microsecond=0).isoformat(),
+        "results": results,
+    }
+    with open(file_path, "w") as file:
+        json.dump(data, file, indent=4, sort_keys=True)
+
+
+def load_results(file_path: str) -> dict:
+    """ Load benchmark results from json file
+
+    Args:
+        file_path (str): json file path
+
+    Returns:
+        dict: results by benchmark name ({} if the file not exists)
+    """
+
+    if not os.path.isfile(file_path):
+        return {}
+
+    with open(file_path) as file:
+        return json.load(file)["results"]
+
+
+def compare_results(results: dict, baseline: dict, threshold: float = 0.2) -> list:
+    """ Compare median of each benchmark with the baseline
+
+    Args:
+        results (dict): current results by benchmark name
+        baseline (dict): baseline results by benchmark name
+        threshold (float, optional): max slowdown allowed (0.2 = 20% slower).
+            Defaults to 0.2.
+
+    Returns:
+        list: comparison of each benchmark
+
+        Structure:
+        [
+            {
+                "name": str,
+                "median": float,
+                "baseline": float (None if not in baseline),
+                "change": float (ratio, like 0.15 for 15% slower),
+                "regression": bool,
+            },
+            ...
+        ]
+    """
+
+    comparison = []
+    for name, result in sorted(results.items()):
+
+        baseline_median = baseline.get(name, {}).get("median")
+        change = None
+        regression = False
+        if baseline_median:
+            change = round(result["median"] / baseline_median - 1, 4)
+            regression = change > threshold
+
+        comparison.append({
+            "name": name,
+            "median": result["median"],
+            "baseline": baseline_median,
+            "change": change,
+            "regression": regression,
+        })
+
+    return comparison
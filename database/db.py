@@ -1,5 +1,9 @@
 import os
+import hashlib
+from datetime import date, datetime
+import threading
 from database.mysql import MySQL
+from database.dict_cache import DictCache
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -7,79 +11,616 @@ DB_HOST = os.getenv("DB_HOST")
 DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASS = os.getenv("DB_PASS")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_LIFETIME = int(os.getenv("DB_POOL_LIFETIME", "3600"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "600"))
+DB_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "500"))
+DB_DICT_CACHE_SIZE = int(os.getenv("DB_DICT_CACHE_SIZE", "10000"))
+DB_GROUP_COMMIT = int(os.getenv("DB_GROUP_COMMIT", "1"))
+DB_DEDUPE = os.getenv("DB_DEDUPE") == "True"
+DB_CHECKPOINTS = os.getenv("DB_CHECKPOINTS") == "True"
+
+# Dictionary tables (tables with only name and id)
+DICT_TABLES = [
+    "columns_origins",
+    "premarket_sectors",
+    "premarket_industries",
+    "premarket_dilution_data",
+    "premarket_adjectives",
+    "extras_origins",
+    "extras_status",
+    "extras_names",
+    "completed_offerings_types",
+    "completed_offerings_methods",
+    "holders_form_types",
+    "filings_names",
+    "noncompliant_deficiencies",
+    "noncompliant_markets",
+]
+DICT_TABLES_LRU = [
+    "holders_institutions",
+    "completed_offerings_investors",
+    "noncompliant_companies",
+]
+
+# Tables of the incremental mode and checkpoints (created if not exists)
+RUN_TABLES = {
+    "tickers_updates": """
+        CREATE TABLE IF NOT EXISTS tickers_updates (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            ticker VARCHAR(20) NOT NULL,
+            premarket_id INT NOT NULL,
+            update_info VARCHAR(255),
+            header_hash CHAR(40),
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            INDEX ticker_index (ticker)
+        )
+    """,
+    "runs_log": """
+        CREATE TABLE IF NOT EXISTS runs_log (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            run_started DATETIME NOT NULL,
+            ticker VARCHAR(20) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            premarket_id INT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            INDEX run_index (run_started)
+        )
+    """,
+    "checkpoints": """
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            run_started DATETIME NOT NULL,
+            ticker VARCHAR(20) NOT NULL,
+            section VARCHAR(20) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            premarket_id INT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            INDEX run_index (run_started, ticker)
+        )
+    """,
+}
+
+# Tables with content-addressed rows (dedupe mode), and snapshots links
+DEDUPE_TABLES = ["news", "filings", "holders"]
+DEDUPE_SNAPSHOTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS rows_snapshots (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        premarket_id INT NOT NULL,
+        table_name VARCHAR(20) NOT NULL,
+        row_id INT NOT NULL,
+        INDEX premarket_index (premarket_id),
+        INDEX row_index (table_name, row_id)
+    )
+"""
+
+# Chars removed from dictionary names (as the old get_clean_text, to match
+# the names already saved)
+DICT_NAME_CHARS = [";", "--", "\b", "\r", "\t", "\n", "\f", "\v", "\0", "'", '"', "\\"]
+
+# Start of the current run (shared by all workers)
+RUN_STARTED = datetime.now().replace(microsecond=0)
 
 
 class Database (MySQL):
 
+    # Dictionary tables cache, shared by all instances
+    dict_cache = None
+    dict_cache_lock = threading.Lock()
+    run_tables_created = False
+    dedupe_tables_created = False
+
+    # Current run (start of the resumed run, in resume mode)
+    run_started = RUN_STARTED
+
+    # Save the sections of each ticker, to resume the run (always in resume mode)
+    checkpoints = DB_CHECKPOINTS
+
     def __init__(self):
 
         # Connect to mysql
-        super().__init__(DB_HOST, DB_NAME, DB_USER, DB_PASS)
+        super().__init__(DB_HOST, DB_NAME, DB_USER, DB_PASS,
+                         DB_POOL_SIZE, DB_POOL_LIFETIME, DB_POOL_TIMEOUT)
 
         self.premarket_id = None
+        self.batch_size = DB_BATCH_SIZE
+
+        # Ticker transactions (unit of work) and group commit
+        self.in_transaction = False
+        self.group_size = DB_GROUP_COMMIT
+        self.group_tickers = 0
+        self.ticker = ""
+        self.group_keys = []
+
+        # Tickers of the groups lost before commit (to scrape again)
+        self.lost_tickers = []
+
+        # Content-addressed rows for news, filings and holders
+        self.dedupe = DB_DEDUPE
+        self.company_name = None
+
+        # Load dictionary tables once
+        with Database.dict_cache_lock:
+            if not Database.dict_cache:
+                # Own connection: the pool can be full of connections held by
+                # open ticker transactions, waiting for the cache
+                cache_mysql = MySQL(DB_HOST, DB_NAME, DB_USER, DB_PASS,
+                                    1, DB_POOL_LIFETIME, DB_POOL_TIMEOUT,
+                                    shared_pool=False)
+                dict_cache = DictCache(cache_mysql, DICT_TABLES,
+                                       DICT_TABLES_LRU, DB_DICT_CACHE_SIZE)
+                dict_cache.preload()
+                Database.dict_cache = dict_cache
+
+            # Create dedupe tables once
+            if self.dedupe and not Database.dedupe_tables_created:
+                self.__create_dedupe_tables__()
+                Database.dedupe_tables_created = True
+
+    def create_run_tables(self):
+        """ Create the tables of the incremental mode and checkpoints
+            (only required when those modes are enabled)
+        """
+
+        with Database.dict_cache_lock:
+            if Database.run_tables_created:
+                return
+
+            for sql in RUN_TABLES.values():
+                self.run_sql(sql)
+            Database.run_tables_created = True
 
-    def __get_dict_table__(self, table_name: str) -> dict:
-        """ Get registers from dictionary table (tables with only name and id)
+    def __create_dedupe_tables__(self):
+        """ Add hash column (with unique index) to the dedupe tables,
+            and create the snapshots links table
+        """
+
+        self.run_sql(DEDUPE_SNAPSHOTS_TABLE)
+
+        for table in DEDUPE_TABLES:
+
+            sql = """
+                SELECT COUNT(*) AS columns_num FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+                AND COLUMN_NAME = 'row_hash'
+            """
+            rows = self.run_sql(sql, params=(table,))
+            if rows[0]["columns_num"]:
+                continue
+
+            sql = f"""
+                ALTER TABLE {table}
+                ADD COLUMN row_hash CHAR(40) NULL,
+                ADD UNIQUE INDEX row_hash_index (row_hash)
+            """
+            self.run_sql(sql)
+
+    def __commit__(self):
+        """ Commit changes, only when there is not a ticker transaction open """
+
+        if not self.in_transaction:
+            self.commit_close()
+
+    def begin_ticker(self, ticker: str = ""):
+        """ Start the transaction of a ticker (savepoint)
 
         Args:
-            table_name (str): table name
+            ticker (str, optional): ticker key, reported in lost_tickers if
+                its group is lost before commit. Defaults to "".
+        """
+
+        self.in_transaction = True
+        self.ticker = ticker
+        try:
+            self.run_sql("SAVEPOINT ticker", auto_commit=False)
+        except Exception as err:
+            self.__lose_group__()
+            raise err
+
+    def end_ticker(self):
+        """ End the transaction of a ticker, commit when the group is full """
+
+        self.in_transaction = False
+        self.group_tickers += 1
+        self.group_keys.append(self.ticker)
+        if self.group_tickers >= self.group_size:
+            self.flush()
+
+    def abort_ticker(self):
+        """ Discard ticker changes (keep the previous tickers of the group) """
+
+        self.in_transaction = False
+
+        # Connection lost or transaction rolled back by the server (deadlock):
+        # the savepoint does not exist anymore
+        try:
+            self.run_sql("ROLLBACK TO SAVEPOINT ticker", auto_commit=False)
+        except Exception as err:
+            self.__lose_group__()
+            raise err
+
+        if not self.group_tickers:
+            self.rollback()
+            self.close()
+
+    def __lose_group__(self):
+        """ Discard the whole transaction and return its connection to the
+            pool, after an error that is not undone by the ticker savepoint.
+            The tickers of the group are saved in lost_tickers
+        """
+
+        try:
+            self.rollback()
+        except Exception:
+            pass
+        self.close()
+
+        self.lost_tickers += self.group_keys
+        self.group_keys = []
+        self.group_tickers = 0
+        self.in_transaction = False
+
+    def __release_on_error__(self):
+        """ Keep the connection after a failed statement while the group has
+            tickers pending to commit (discarded only by abort_ticker)
+        """
+
+        if self.group_tickers:
+            return
+
+        super().__release_on_error__()
+
+    def begin_section(self):
+        """ Start the changes of an optional section, inside the ticker
+            transaction (savepoint)
+        """
+
+        self.run_sql("SAVEPOINT section", auto_commit=False)
+
+    def abort_section(self):
+        """ Discard the changes of an optional section (keep the ticker) """
+
+        self.run_sql("ROLLBACK TO SAVEPOINT section", auto_commit=False)
+
+    def flush(self):
+        """ Commit the tickers pending in the current group """
+
+        try:
+            self.commit()
+        except Exception as err:
+            self.__lose_group__()
+            raise err
+
+        self.close()
+        self.group_keys = []
+        self.group_tickers = 0
+
+    def get_tickers_updates(self) -> dict:
+        """ Get the last update saved of each ticker (for the incremental mode)
+
+        Returns:
+            dict: last update of each ticker
+
+            Structure:
+            {
+                "str (ticker)": {
+                    "premarket_id": int,
+                    "update_info": str,
+                    "header_hash": str,
+                },
+                ...
+            }
+        """
+
+        sql = """
+            SELECT tickers_updates.ticker, tickers_updates.premarket_id,
+                   tickers_updates.update_info, tickers_updates.header_hash
+            FROM tickers_updates
+            INNER JOIN (
+                SELECT MAX(id) AS id FROM tickers_updates GROUP BY ticker
+            ) AS last_updates ON last_updates.id = tickers_updates.id
+        """
+        rows = self.run_sql(sql)
+
+        tickers_updates = {}
+        for row in rows:
+            tickers_updates[row["ticker"]] = {
+                "premarket_id": row["premarket_id"],
+                "update_info": row["update_info"],
+                "header_hash": row["header_hash"],
+            }
+
+        return tickers_updates
+
+    def get_last_filings(self) -> dict:
+        """ Get the last filings saved of each company (high-water mark,
+            to scrape only the new filings)
 
         Returns:
-            list: registers found
+            dict: last filings date and links of each company
 
             Structure:
             {
-                "str (name)": int (index),
+                "str (company name)": {
+                    "date": date,
+                    "links": [str (links saved with date), ...],
+                },
+                ...
             }
         """
 
-        sql = f"""
-            SELECT * FROM {table_name}
+        sql = """
+            SELECT premarket.name, filings.date, filings.link
+            FROM filings
+            INNER JOIN premarket ON premarket.id = filings.premarket_id
+            INNER JOIN (
+                SELECT premarket.name, MAX(filings.date) AS date
+                FROM filings
+                INNER JOIN premarket ON premarket.id = filings.premarket_id
+                GROUP BY premarket.name
+            ) AS last_filings ON last_filings.name = premarket.name
+                AND last_filings.date = filings.date
         """
+        rows = self.run_sql(sql)
 
-        data = self.run_sql(sql)
+        last_filings = {}
+        for row in rows:
+            filings_date = row["date"]
+            if isinstance(filings_date, datetime):
+                filings_date = filings_date.date()
 
-        # Format data
-        data_dict = {}
-        for row in data:
-            data_dict[row["name"]] = row["id"]
+            company_filings = last_filings.setdefault(row["name"], {
+                "date": filings_date,
+                "links": [],
+            })
+            if row["link"] and row["link"] not in company_filings["links"]:
+                company_filings["links"].append(row["link"])
 
-        return data_dict
+        return last_filings
 
-    def __insert_dict_table__(self, table_name: str, name: str):
-        """ Insert a name a dictionary table (tables with only name and id)
+    def save_ticker_update(self, ticker: str, premarket_data: dict):
+        """ Save the update info and header hash of the last premarket saved,
+            and register the ticker as scraped in the run log
 
         Args:
-            table_name (str): table name
-            name (str): name to insert (already cleaned and with quotes)
+            ticker (str): ticker key
+            premarket_data (dict): premarket data (from get_premarket_data)
+        """
+
+        sql = self.get_insert_sql("tickers_updates", [
+            "ticker",
+            "premarket_id",
+            "update_info",
+            "header_hash",
+        ])
+        params = (
+            ticker,
+            self.premarket_id,
+            self.__get_value__(premarket_data["update_info"]),
+            self.__get_value__(premarket_data["header_hash"]),
+        )
+        self.run_sql(sql, auto_commit=False, params=params)
+
+        self.save_run_log(ticker, "scraped", self.premarket_id)
+
+    def save_run_log(self, ticker: str, status: str, premarket_id: int = None):
+        """ Register the result of a ticker in the current run
+
+        Args:
+            ticker (str): ticker key
+            status (str): scraped, skipped, not_found or error
+            premarket_id (int, optional): premarket saved (or reused) for
+                the ticker. Defaults to None.
+        """
+
+        sql = self.get_insert_sql("runs_log", [
+            "run_started",
+            "ticker",
+            "status",
+            "premarket_id",
+        ])
+        params = (Database.run_started, ticker, status, premarket_id)
+        self.run_sql(sql, auto_commit=False, params=params)
+
+        # Commit changes
+        self.__commit__()
+
+    def save_checkpoint(self, ticker: str, sections: dict, premarket_id: int = None):
+        """ Register the sections saved of a ticker in the current run
+            (inside the ticker transaction, to be committed with its data)
+
+        Args:
+            ticker (str): ticker key
+            sections (dict): status of each section (done, failed, not_found or skipped)
+                Structure:
+                {
+                    "str (section name)": "str (status)",
+                    ...
+                }
+            premarket_id (int, optional): premarket of the sections.
+                Defaults to None (last premarket saved).
+        """
+
+        if not Database.checkpoints:
+            return
+
+        if not premarket_id:
+            premarket_id = self.premarket_id
+
+        rows = []
+        for section, status in sections.items():
+            rows.append((Database.run_started, ticker, section, status, premarket_id))
+
+        sql = self.get_insert_sql("checkpoints", [
+            "run_started",
+            "ticker",
+            "section",
+            "status",
+            "premarket_id",
+        ])
+        self.run_many(sql, rows, self.batch_size)
+
+        # Commit changes
+        self.__commit__()
+
+    def get_checkpoint(self) -> tuple:
+        """ Get the sections saved of each ticker in the last run
+
+        Returns:
+            tuple: start of the last run (None if there are not checkpoints),
+                and last status of the sections of each ticker
+
+            Structure:
+            (
+                datetime,
+                {
+                    "str (ticker)": {
+                        "str (section name)": {
+                            "status": str,
+                            "premarket_id": int,
+                        },
+                        ...
+                    },
+                    ...
+                }
+            )
+        """
+
+        rows = self.run_sql("SELECT MAX(run_started) AS run_started FROM checkpoints")
+        run_started = rows[0]["run_started"]
+        if not run_started:
+            return None, {}
+
+        sql = """
+            SELECT checkpoints.ticker, checkpoints.section, checkpoints.status,
+                   checkpoints.premarket_id
+            FROM checkpoints
+            INNER JOIN (
+                SELECT MAX(id) AS id FROM checkpoints
+                WHERE run_started = %s
+                GROUP BY ticker, section
+            ) AS last_checkpoints ON last_checkpoints.id = checkpoints.id
+        """
+        rows = self.run_sql(sql, params=(run_started,))
+
+        checkpoint = {}
+        for row in rows:
+            ticker_checkpoint = checkpoint.setdefault(row["ticker"], {})
+            ticker_checkpoint[row["section"]] = {
+                "status": row["status"],
+                "premarket_id": row["premarket_id"],
+            }
+
+        return run_started, checkpoint
+
+    def resume_premarket(self, premarket_id: int):
+        """ Use a premarket saved before, to save its missing sections
+
+        Args:
+            premarket_id (int): premarket id
+        """
+
+        self.premarket_id = premarket_id
+
+        sql = "SELECT name FROM premarket WHERE id = %s"
+        rows = self.run_sql(sql, auto_commit=False, params=(premarket_id,))
+        self.company_name = rows[0]["name"] if rows else None
+
+    def __get_value__(self, value):
+        """ Format a scraped value to send it as sql parameter
+
+        Args:
+            value (any): scraped value
+
+        Returns:
+            any: value, or None for empty values
+        """
+
+        if value in [None, "", "NULL"]:
+            return None
+
+        return value
+
+    def __get_date__(self, value) -> date:
+        """ Get date part of a scraped datetime
+
+        Args:
+            value (datetime): scraped datetime
+
+        Returns:
+            date: date, or None for empty values
         """
 
-        # Insert new name
-        sql = f"""
-            INSERT INTO {table_name} (name)
-            VALUES ("{name}")
+        if not isinstance(value, datetime):
+            return None
+
+        return value.date()
+
+    def __get_hash__(self, *values) -> str:
+        """ Get stable hash of the content of a row
+
+        Returns:
+            str: sha1 hex digest
         """
 
-        self.run_sql(sql, auto_commit=False)
+        content = "\x1f".join(["" if value is None else str(value) for value in values])
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
 
-    def __get_column_origin__(self, origin: str) -> int:
-        """ Get a register from columns_origins table
+    def __save_dedupe_rows__(self, table: str, columns: list, rows: list, hashes: list):
+        """ Save rows only once by content hash, and link all of them
+            (new and repeated) to the current premarket
+
+        Args:
+            table (str): table name
+            columns (list): columns names (without row_hash)
+            rows (list): values of each row (tuples)
+            hashes (list): content hash of each row
+        """
+
+        # Insert new rows (repeated hashes are kept by the unique index)
+        sql = self.get_insert_sql(table, columns + ["row_hash"])
+        sql += " ON DUPLICATE KEY UPDATE id = id"
+        rows_hashed = [row + (row_hash,) for row, row_hash in zip(rows, hashes)]
+        self.run_many(sql, rows_hashed, self.batch_size)
+
+        # Get ids of all the rows of the snapshot
+        hashes = list(dict.fromkeys(hashes))
+        rows_ids = []
+        for batch_start in range(0, len(hashes), self.batch_size):
+            batch = hashes[batch_start:batch_start + self.batch_size]
+            placeholders = ", ".join(["%s"] * len(batch))
+            sql = f"SELECT id FROM {table} WHERE row_hash IN ({placeholders})"
+            rows_ids += self.run_sql(sql, auto_commit=False, params=tuple(batch))
+
+        # Link rows to premarket
+        links = [(self.premarket_id, table, row["id"]) for row in rows_ids]
+        sql = self.get_insert_sql("rows_snapshots", [
+            "premarket_id",
+            "table_name",
+            "row_id",
+        ])
+        self.run_many(sql, links, self.batch_size)
+
+    def __get_dict_id__(self, table_name: str, name: str) -> int:
+        """ Get id of a name in a dictionary table (tables with only name and id)
             (create if not exists)
 
         Args:
-            origin (str): origin name
+            table_name (str): table name
+            name (str): name to find
 
         Returns:
-            int: origin id
+            int: name id (empty names are saved as "NULL", like before)
         """
 
-        columns_origins = self.__get_dict_table__("columns_origins")
-        columns_origin_id = columns_origins.get(origin, None)
-        if not origin in columns_origins.keys():
-            self.__insert_dict_table__("columns_origins", origin)
-            columns_origin_id = self.cursor.lastrowid
+        # Same normalization of the names already saved
+        if not name:
+            name = "NULL"
+        name = str(name)
+        for char in DICT_NAME_CHARS:
+            name = name.replace(char, "")
 
-        return columns_origin_id
+        return Database.dict_cache.get_id(table_name, name)
 
     def __save_columns__(self, columns_data: list, colunms_origin: str):
         """ Save columns in database
@@ -97,31 +638,30 @@ class Database (MySQL):
             colunms_origin (str): columns origin name
         """
 
-        columns_origin_id = self.__get_column_origin__(colunms_origin)
+        columns_origin_id = self.__get_dict_id__("columns_origins", colunms_origin)
 
+        rows = []
         for column in columns_data:
-
-            sql = f"""
-                INSERT INTO columns (
-                    origin_id,
-                    premarket_id,
-                    position,
-                    date,
-                    hos
-                ) values (
-                    {columns_origin_id},
-                    {self.premarket_id},
-                    {column["position"]},
-                    "{column["date"].strftime("%Y-%m-%d")}",
-                    {column["hos"]}
-                )
-            """
-
-            self.run_sql(sql, auto_commit=False)
-
-    def __get_dict_tables_data__(self, tables: dict, values: dict, ids: dict = {}) -> dict:
-        """ Query multiple dicts (tables with only name and id) from database
-            and create registers if not exists, and return ids.
+            rows.append((
+                columns_origin_id,
+                self.premarket_id,
+                column["position"],
+                self.__get_date__(column["date"]),
+                self.__get_value__(column["hos"]),
+            ))
+
+        sql = self.get_insert_sql("columns", [
+            "origin_id",
+            "premarket_id",
+            "position",
+            "date",
+            "hos",
+        ])
+        self.run_many(sql, rows, self.batch_size)
+
+    def __get_dict_tables_data__(self, tables: dict, values: dict) -> dict:
+        """ Get ids of multiple dicts (tables with only name and id)
+            and create registers if not exists.
 
             All keys from tables must be in values dict
 
@@ -134,37 +674,22 @@ class Database (MySQL):
             values (dict): values to insert
                 Structure:
                 {
-                    "str (table_name)": "str (scraping value)",
+                    "str (field_name)": "str (scraping value)",
                     ...
                 }
-            ids (dict, optional): Dictionary to save final ids. Defaults to [].
 
         Returns:
-            dict: tables ids
+            dict: ids of each field
                 Structure:
                 {
-                    "table_name": "id",
+                    "field_name": int (id),
                     ...
                 }
         """
 
-        # Insert new dict data in tables
+        ids = {}
         for field, table in tables.items():
-
-            # Get new sectors
-            fields = self.__get_dict_table__(table)
-            fields_names = fields.keys()
-            current_field = self.get_clean_text(values[field], add_quotes=False)
-
-            # Save fields data
-            ids[field] = fields
-
-            # Save new sector
-            if not current_field in fields_names:
-                self.__insert_dict_table__(table, current_field)
-
-                # Update fields data
-                ids[field][current_field] = self.cursor.lastrowid
+            ids[field] = self.__get_dict_id__(table, values[field])
 
         return ids
 
@@ -208,81 +733,55 @@ class Database (MySQL):
             "cash_need": "premarket_adjectives",
         }
 
-        dict_tables_data = self.__get_dict_tables_data__(
-            tables, premarket_data)
-
-        # Insert new dict data in tables
-        for field, table in tables.items():
-
-            # Get new sectors
-            fields = self.__get_dict_table__(table)
-            fields_names = fields.keys()
-            premarket_field = premarket_data[field]
-
-            # Save fields data
-            dict_tables_data[field] = fields
-
-            # Save new sector
-            if not premarket_field in fields_names:
-                self.__insert_dict_table__(table, premarket_field)
-
-                # Update fields data
-                dict_tables_data[field][premarket_field] = self.cursor.lastrowid
-
-        # fix "out_take"
-        if premarket_data["out_take"]:
-            premarket_data["out_take"] = f"'{premarket_data['out_take']}'"
-        else:
-            premarket_data["out_take"] = "NULL"
+        dict_ids = self.__get_dict_tables_data__(tables, premarket_data)
 
         # Save premarket data
-        sql = f"""
-            INSERT INTO premarket (
-                name,
-                sector_id,
-                industry_id,
-                mkt_cap,
-                float_cap,
-                est_cash_sh,
-                t25_inst_own,
-                si,
-                description_company,
-                dilution_data_id,
-                overall_risk,
-                offering_ability,
-                dilution_amt_ex_shelf,
-                historical,
-                cash_need,
-                our_take,
-                update_info
-            ) values (
-                {self.get_clean_text(premarket_data["name"])},
-                {dict_tables_data["sector"][premarket_data["sector"]]},
-                {dict_tables_data["industry"][premarket_data["industry"]]},
-                {premarket_data["mkt_cap"]},
-                {premarket_data["float_cap"]},
-                {premarket_data["est_cash_sh"]},
-                {premarket_data["t25_inst_own"]},
-                {premarket_data["si"]},
-                {self.get_clean_text(premarket_data["description_company"])},
-                {dict_tables_data["dilution_data"][premarket_data["dilution_data"]]},
-                {dict_tables_data["overall_risk"][premarket_data["overall_risk"]]},
-                {dict_tables_data["offering_abillity"][premarket_data["offering_abillity"]]},
-                {dict_tables_data["dilution_amt_ex_shelf"][premarket_data["dilution_amt_ex_shelf"]]},
-                {dict_tables_data["historical"][premarket_data["historical"]]},
-                {dict_tables_data["cash_need"][premarket_data["cash_need"]]},
-                {self.get_clean_text(premarket_data["out_take"])},
-                {self.get_clean_text(premarket_data["update_info"])}
-            )
-        """
-        
-        self.run_sql(sql, auto_commit=False)
+        sql = self.get_insert_sql("premarket", [
+            "name",
+            "sector_id",
+            "industry_id",
+            "mkt_cap",
+            "float_cap",
+            "est_cash_sh",
+            "t25_inst_own",
+            "si",
+            "description_company",
+            "dilution_data_id",
+            "overall_risk",
+            "offering_ability",
+            "dilution_amt_ex_shelf",
+            "historical",
+            "cash_need",
+            "our_take",
+            "update_info",
+        ])
+        params = (
+            self.__get_value__(premarket_data["name"]),
+            dict_ids["sector"],
+            dict_ids["industry"],
+            self.__get_value__(premarket_data["mkt_cap"]),
+            self.__get_value__(premarket_data["float_cap"]),
+            self.__get_value__(premarket_data["est_cash_sh"]),
+            self.__get_value__(premarket_data["t25_inst_own"]),
+            self.__get_value__(premarket_data["si"]),
+            self.__get_value__(premarket_data["description_company"]),
+            dict_ids["dilution_data"],
+            dict_ids["overall_risk"],
+            dict_ids["offering_abillity"],
+            dict_ids["dilution_amt_ex_shelf"],
+            dict_ids["historical"],
+            dict_ids["cash_need"],
+            self.__get_value__(premarket_data["out_take"]),
+            self.__get_value__(premarket_data["update_info"]),
+        )
+        self.run_sql(sql, auto_commit=False, params=params)
 
         # Get premarket id
         self.premarket_id = self.cursor.lastrowid
+        self.company_name = premarket_data["name"]
 
         # Commit changes
-        self.commit_close()
+        self.__commit__()
 
     def save_historical_data(self, historical_data: dict):
         """ Save in database the historial data
@@ -309,33 +808,32 @@ class Database (MySQL):
         """
 
         # Save historial data
-        sql = f"""
-            INSERT INTO historical (
-                premarket_id,
-                atm,
-                warrant,
-                convertible_preferred,
-                convertible_note,
-                equality_line,
-                s1_offering
-            ) values (
-                {self.premarket_id},
-                {historical_data["atm"]},
-                {historical_data["warrant"]},
-                {historical_data["convertible_preferred"]},
-                {historical_data["convertible_note"]},
-                {historical_data["equality_line"]},
-                {historical_data["s1_offering"]}
-            )
-        """
-        self.run_sql(sql, auto_commit=False)
+        sql = self.get_insert_sql("historical", [
+            "premarket_id",
+            "atm",
+            "warrant",
+            "convertible_preferred",
+            "convertible_note",
+            "equality_line",
+            "s1_offering",
+        ])
+        params = (
+            self.premarket_id,
+            self.__get_value__(historical_data["atm"]),
+            self.__get_value__(historical_data["warrant"]),
+            self.__get_value__(historical_data["convertible_preferred"]),
+            self.__get_value__(historical_data["convertible_note"]),
+            self.__get_value__(historical_data["equality_line"]),
+            self.__get_value__(historical_data["s1_offering"]),
+        )
+        self.run_sql(sql, auto_commit=False, params=params)
 
         # Insert columns data
         columns_data = historical_data["columns_data"]
         self.__save_columns__(columns_data, "historical")
 
         # Commit changes
-        self.commit_close()
+        self.__commit__()
 
     def save_cash_data(self, cash_data: dict):
         """ Save in database the cash data
@@ -364,37 +862,36 @@ class Database (MySQL):
         """
 
         # Save cash data
-        sql = f"""
-            INSERT INTO cash (
-                premarket_id,
-                cash_description,
-                months_of_cash,
-                quarterly_cash_burn_m,
-                current_cash_m,
-                m,
-                prorated_operating,
-                capital_rise,
-                current_cash_sheet
-            ) values (
-                {self.premarket_id},
-                {self.get_clean_text(cash_data["cash_description"])},
-                {cash_data["months_of_cash"]},
-                {cash_data["quarterly_cash_burn_m"]},
-                {cash_data["current_cash_m"]},
-                {cash_data["m"]},
-                {cash_data["prorated_operating"]},
-                {cash_data["capital_rise"]},
-                {cash_data["current_cash_sheet"]}
-            )
-        """
-        self.run_sql(sql, auto_commit=False)
+        sql = self.get_insert_sql("cash", [
+            "premarket_id",
+            "cash_description",
+            "months_of_cash",
+            "quarterly_cash_burn_m",
+            "current_cash_m",
+            "m",
+            "prorated_operating",
+            "capital_rise",
+            "current_cash_sheet",
+        ])
+        params = (
+            self.premarket_id,
+            self.__get_value__(cash_data["cash_description"]),
+            self.__get_value__(cash_data["months_of_cash"]),
+            self.__get_value__(cash_data["quarterly_cash_burn_m"]),
+            self.__get_value__(cash_data["current_cash_m"]),
+            self.__get_value__(cash_data["m"]),
+            self.__get_value__(cash_data["prorated_operating"]),
+            self.__get_value__(cash_data["capital_rise"]),
+            self.__get_value__(cash_data["current_cash_sheet"]),
+        )
+        self.run_sql(sql, auto_commit=False, params=params)
 
         # Insert columns data
         columns_data = cash_data["columns_data"]
         self.__save_columns__(columns_data, "cash")
 
         # Commit changes
-        self.commit_close()
+        self.__commit__()
 
     def save_extra_data(self, extra_data: list):
         """ Save in database the extra data
@@ -422,41 +919,36 @@ class Database (MySQL):
             "name": "extras_names",
         }
         
-        # Split extra data in 5 chunks
-        extra_data_chunks = [extra_data[i:i + 5] for i in range(0, len(extra_data), 5)]
-
-        # Save each row
-        dict_tables_data = {}
-        for extra_data in extra_data_chunks:
-            for extra_data_row in extra_data:
-
-                self.__get_dict_tables_data__(
-                    tables, extra_data_row, dict_tables_data)
-
-                # Save row data
-                sql = f"""
-                    INSERT INTO extras (
-                        premarket_id,
-                        origin_id,
-                        status_id,
-                        name_id,
-                        position,
-                        title,
-                        item
-                    ) values (
-                        {self.premarket_id},
-                        {dict_tables_data["origin"][extra_data_row["origin"]]},
-                        {dict_tables_data["status"][extra_data_row["status"]]},
-                        {dict_tables_data["name"][extra_data_row["name"]]},
-                        {extra_data_row["position"]},
-                        {self.get_clean_text(extra_data_row["title"])},
-                        {self.get_clean_text(extra_data_row["value"])}
-                    )
-                """
-                self.run_sql(sql, auto_commit=False)
+        # Get rows data
+        rows = []
+        for extra_data_row in extra_data:
+
+            dict_ids = self.__get_dict_tables_data__(tables, extra_data_row)
+
+            rows.append((
+                self.premarket_id,
+                dict_ids["origin"],
+                dict_ids["status"],
+                dict_ids["name"],
+                extra_data_row["position"],
+                self.__get_value__(extra_data_row["title"]),
+                self.__get_value__(extra_data_row["value"]),
+            ))
+
+        # Save rows in batches
+        sql = self.get_insert_sql("extras", [
+            "premarket_id",
+            "origin_id",
+            "status_id",
+            "name_id",
+            "position",
+            "title",
+            "item",
+        ])
+        self.run_many(sql, rows, self.batch_size)
 
-            # Commit changes
-            self.commit_close()
+        # Commit changes
+        self.__commit__()
 
     def save_completed_offering_data(self, completed_offering_data: list):
         """ Save in database the complete offering data
@@ -487,48 +979,42 @@ class Database (MySQL):
             "investors": "completed_offerings_investors",
         }
 
-        
-        # Split data un chunks
-        completed_offering_data_chunks = [completed_offering_data[i:i + 5] for i in range(0, len(completed_offering_data), 5)]
-        
-        dict_tables_data = {}
-        for completed_offering_data in completed_offering_data_chunks:
-            
-            for completed_data_row in completed_offering_data:
-
-                self.__get_dict_tables_data__(
-                    tables, completed_data_row, dict_tables_data)
-
-                # Save row data
-                sql = f"""
-                    INSERT INTO completed_offerings (
-                        premarket_id,
-                        type_id,
-                        method_id,
-                        share_equivalent,
-                        price,
-                        warrants,
-                        offering_amt,
-                        bank,
-                        investors,
-                        date
-                    ) values (
-                        {self.premarket_id},
-                        {dict_tables_data["type"][completed_data_row["type"]]},
-                        {dict_tables_data["method"][completed_data_row["method"]]},
-                        {completed_data_row["share_equivalent"]},
-                        {completed_data_row["price"]},
-                        {completed_data_row["warrants"]},
-                        {completed_data_row["offering_amt"]},
-                        {self.get_clean_text(completed_data_row["bank"])},
-                        {dict_tables_data["investors"][completed_data_row["investors"]]},
-                        "{completed_data_row["date"].strftime("%Y-%m-%d")}"
-                    )
-                """
-                self.run_sql(sql, auto_commit=False)
+        # Get rows data
+        rows = []
+        for completed_data_row in completed_offering_data:
+
+            dict_ids = self.__get_dict_tables_data__(tables, completed_data_row)
+
+            rows.append((
+                self.premarket_id,
+                dict_ids["type"],
+                dict_ids["method"],
+                self.__get_value__(completed_data_row["share_equivalent"]),
+                self.__get_value__(completed_data_row["price"]),
+                self.__get_value__(completed_data_row["warrants"]),
+                self.__get_value__(completed_data_row["offering_amt"]),
+                self.__get_value__(completed_data_row["bank"]),
+                dict_ids["investors"],
+                self.__get_date__(completed_data_row["date"]),
+            ))
+
+        # Save rows in batches
+        sql = self.get_insert_sql("completed_offerings", [
+            "premarket_id",
+            "type_id",
+            "method_id",
+            "share_equivalent",
+            "price",
+            "warrants",
+            "offering_amt",
+            "bank",
+            "investors",
+            "date",
+        ])
+        self.run_many(sql, rows, self.batch_size)
 
-            # Commit changes
-            self.commit_close()
+        # Commit changes
+        self.__commit__()
 
     def save_news_data(self, news_data: list):
         """ Save in database the news data
@@ -549,31 +1035,45 @@ class Database (MySQL):
             ]
         """
 
-        # Save each row
+        # Get rows data
+        rows = []
+        hashes = []
         for news_data_row in news_data:
-
-            # Save row data
-            sql = f"""
-                INSERT INTO news (
-                    premarket_id,
-                    time_ago_number,
-                    time_ago_label,
-                    datetime,
-                    headline,
-                    link
-                ) values (
-                    {self.premarket_id},
-                    {news_data_row["time_ago_number"]},
-                    {self.get_clean_text(news_data_row["time_ago_label"])},
-                    "{news_data_row["datetime"].strftime("%Y-%m-%d %H:%M:%S")}",
-                    {self.get_clean_text(news_data_row["headline"])},
-                    "{news_data_row["link"]}"
-                )
-            """
-            self.run_sql(sql, auto_commit=False)
+            rows.append((
+                self.premarket_id,
+                news_data_row["time_ago_number"],
+                self.__get_value__(news_data_row["time_ago_label"]),
+                news_data_row["datetime"],
+                self.__get_value__(news_data_row["headline"]),
+                self.__get_value__(news_data_row["link"]),
+            ))
+
+            # Identify news by link (by headline and date if there is not link)
+            link = self.__get_value__(news_data_row["link"])
+            if link:
+                hashes.append(self.__get_hash__(link))
+            else:
+                hashes.append(self.__get_hash__(self.company_name,
+                                                news_data_row["headline"],
+                                                news_data_row["datetime"]))
+
+        # Save rows in batches
+        columns = [
+            "premarket_id",
+            "time_ago_number",
+            "time_ago_label",
+            "datetime",
+            "headline",
+            "link",
+        ]
+        if self.dedupe:
+            self.__save_dedupe_rows__("news", columns, rows, hashes)
+        else:
+            sql = self.get_insert_sql("news", columns)
+            self.run_many(sql, rows, self.batch_size)
 
         # Commit changes
-        self.commit_close()
+        self.__commit__()
 
     def save_holders_data (self, holders_data: list):
         """ Save in database the holders data data
@@ -601,43 +1101,52 @@ class Database (MySQL):
             "form": "holders_form_types",
         }
 
-        # Save each row
-        dict_tables_data = {}
+        # Get rows data
+        rows = []
+        hashes = []
         for holders_data_row in holders_data:
 
-            self.__get_dict_tables_data__(
-                tables, 
-                holders_data_row,
-                dict_tables_data
-            )
-
-            # Save row data
-            sql = f"""
-                INSERT INTO holders (
-                    premarket_id,
-                    institution_id,
-                    percentage,
-                    shares,
-                    change_,
-                    form_type_id,
-                    efective,
-                    field_
-                ) values (
-                    {self.premarket_id},
-                    {dict_tables_data["institution_name"][holders_data_row["institution_name"]]},
-                    {holders_data_row["percentage"]},
-                    {holders_data_row["shares"]},
-                    {holders_data_row["change"]},
-                    {dict_tables_data["form"][holders_data_row["form"]]},
-                    "{holders_data_row["efective"].strftime("%Y-%m-%d")}",
-                    "{holders_data_row["field"].strftime("%Y-%m-%d")}"
-                )
-                   
-            """
-            self.run_sql(sql, auto_commit=False)
+            dict_ids = self.__get_dict_tables_data__(tables, holders_data_row)
+
+            rows.append((
+                self.premarket_id,
+                dict_ids["institution_name"],
+                self.__get_value__(holders_data_row["percentage"]),
+                self.__get_value__(holders_data_row["shares"]),
+                self.__get_value__(holders_data_row["change"]),
+                dict_ids["form"],
+                self.__get_date__(holders_data_row["efective"]),
+                self.__get_date__(holders_data_row["field"]),
+            ))
+
+            # Identify positions by company, institution, shares and dates
+            hashes.append(self.__get_hash__(
+                self.company_name,
+                dict_ids["institution_name"],
+                holders_data_row["shares"],
+                self.__get_date__(holders_data_row["efective"]),
+                self.__get_date__(holders_data_row["field"]),
+            ))
+
+        # Save rows in batches
+        columns = [
+            "premarket_id",
+            "institution_id",
+            "percentage",
+            "shares",
+            "change_",
+            "form_type_id",
+            "efective",
+            "field_",
+        ]
+        if self.dedupe:
+            self.__save_dedupe_rows__("holders", columns, rows, hashes)
+        else:
+            sql = self.get_insert_sql("holders", columns)
+            self.run_many(sql, rows, self.batch_size)
 
         # Commit changes
-        self.commit_close()
+        self.__commit__()
 
     def save_filings_data (self, filings_data:list):
         """ Save in database the filings data
@@ -661,41 +1170,47 @@ class Database (MySQL):
             "name": "filings_names"
         }
         
-        
-        # Split filings data in chunks
-        filings_data_chunks = [filings_data[i:i + 5] for i in range(0, len(filings_data), 5)]
-        
-        dict_tables_data = {}
-        for filings_data in filings_data_chunks:
-        
-            for filings_data_row in filings_data:
-
-                self.__get_dict_tables_data__(
-                    tables, 
-                    filings_data_row,
-                    dict_tables_data
-                )
-
-                # Save row data
-                sql = f"""
-                    INSERT INTO filings (
-                        premarket_id,
-                        name_id,
-                        headline,
-                        date,
-                        link
-                    ) values (
-                        {self.premarket_id},
-                        {dict_tables_data["name"][filings_data_row["name"]]},
-                        {self.get_clean_text(filings_data_row["headline"])},
-                        "{filings_data_row["date"].strftime("%Y-%m-%d")}",
-                        "{filings_data_row["link"]}"
-                    )                      
-                """
-                self.run_sql(sql, auto_commit=False)
+        # Get rows data
+        rows = []
+        hashes = []
+        for filings_data_row in filings_data:
+
+            dict_ids = self.__get_dict_tables_data__(tables, filings_data_row)
+
+            rows.append((
+                self.premarket_id,
+                dict_ids["name"],
+                self.__get_value__(filings_data_row["headline"]),
+                self.__get_date__(filings_data_row["date"]),
+                self.__get_value__(filings_data_row["link"]),
+            ))
+
+            # Identify filings by link (by name, headline and date if there is not link)
+            link = self.__get_value__(filings_data_row["link"])
+            if link:
+                hashes.append(self.__get_hash__(link))
+            else:
+                hashes.append(self.__get_hash__(self.company_name,
+                                                dict_ids["name"],
+                                                filings_data_row["headline"],
+                                                self.__get_date__(filings_data_row["date"])))
+
+        # Save rows in batches
+        columns = [
+            "premarket_id",
+            "name_id",
+            "headline",
+            "date",
+            "link",
+        ]
+        if self.dedupe:
+            self.__save_dedupe_rows__("filings", columns, rows, hashes)
+        else:
+            sql = self.get_insert_sql("filings", columns)
+            self.run_many(sql, rows, self.batch_size)
 
-            # Commit changes
-            self.commit_close()
+        # Commit changes
+        self.__commit__()
 
     def save_noncompliant_data (self, noncompliant_data:list):
         """ Save in database the no compliant data
@@ -723,33 +1238,29 @@ class Database (MySQL):
         
         if noncompliant_data:
             
-            dict_tables_data = {}
+            # Get rows data
+            rows = []
             for noncompliant_row in noncompliant_data:
 
-                self.__get_dict_tables_data__(
-                    tables, 
-                    noncompliant_row,
-                    dict_tables_data
-                )
-
-                # Save row data
-                sql = f"""
-                    INSERT INTO noncompliant (
-                        company_id,
-                        deficiency_id,
-                        market_id,
-                        notification_date,
-                        premarket_id
-                    ) values (
-                        {dict_tables_data["company"][noncompliant_row["company"]]},
-                        {dict_tables_data["deficiency"][noncompliant_row["deficiency"]]},
-                        {dict_tables_data["market"][noncompliant_row["market"]]},
-                        "{noncompliant_row["notification_date"].strftime("%Y-%m-%d")}",
-                        {self.premarket_id}
-                    )
-                                        
-                """
-                self.run_sql(sql, auto_commit=False)
+                dict_ids = self.__get_dict_tables_data__(tables, noncompliant_row)
+
+                rows.append((
+                    dict_ids["company"],
+                    dict_ids["deficiency"],
+                    dict_ids["market"],
+                    self.__get_date__(noncompliant_row["notification_date"]),
+                    self.premarket_id,
+                ))
+
+            # Save rows in batches
+            sql = self.get_insert_sql("noncompliant", [
+                "company_id",
+                "deficiency_id",
+                "market_id",
+                "notification_date",
+                "premarket_id",
+            ])
+            self.run_many(sql, rows, self.batch_size)
 
             # Commit changes
-            self.commit_close()
\ No newline at end of file
+            self.__commit__()
\ No newline at end of file
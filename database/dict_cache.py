@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+from database.mysql import MySQL
+
+
+class DictCache ():
+
+    def __init__ (self, mysql: MySQL, tables: list, lru_tables: list = [],
+                  lru_size: int = 10000):
+        """ Process-wide cache of dictionary tables (tables with only name and id).
+            Names are looked up in memory, and inserted (and committed) in
+            database only when they are new
+
+        Args:
+            mysql (MySQL): mysql instance used only by the cache, with its
+                own connection (not shared with the ticker transactions)
+            tables (list): dictionary tables names
+            lru_tables (list, optional): big tables, only the most recent
+                used names are kept in memory. Defaults to [].
+            lru_size (int, optional): max names in memory for each lru table.
+                Defaults to 10000.
+        """
+
+        self.mysql = mysql
+        self.lru_tables = lru_tables
+        self.lru_size = lru_size
+
+        self.tables = {}
+        for table in tables + lru_tables:
+            self.tables[table] = OrderedDict()
+
+        self.lock = threading.Lock()
+
+    def preload (self):
+        """ Load dictionary tables from database
+            (last registers only, for lru tables)
+        """
+
+        with self.lock:
+            for table, names in self.tables.items():
+
+                sql = f"SELECT id, name FROM {table}"
+                if table in self.lru_tables:
+                    sql = f"SELECT * FROM ({sql} ORDER BY id DESC LIMIT {self.lru_size}) AS last_names ORDER BY id"
+
+                for row in self.mysql.run_sql(sql):
+                    names[row["name"]] = row["id"]
+
+    def get_id (self, table: str, name: str) -> int:
+        """ Get id of a name in a dictionary table (create if not exists)
+
+        Args:
+            table (str): table name
+            name (str): name to find (already cleaned)
+
+        Returns:
+            int: name id
+        """
+
+        with self.lock:
+
+            names = self.tables.setdefault(table, OrderedDict())
+
+            # Get from memory
+            if name in names:
+                if table in self.lru_tables:
+                    names.move_to_end(name)
+                return names[name]
+
+            # Get from database (could be inserted by other process)
+            sql = f"SELECT id FROM {table} WHERE name = %s LIMIT 1"
+            rows = self.mysql.run_sql(sql, auto_commit=False, params=(name,))
+            if rows:
+                name_id = rows[0]["id"]
+            else:
+
+                # Insert and commit new name, to be visible for all workers
+                sql = f"INSERT INTO {table} (name) VALUES (%s)"
+                self.mysql.run_sql(sql, auto_commit=False, params=(name,))
+                name_id = self.mysql.cursor.lastrowid
+
+            self.mysql.commit_close()
+
+            # Save in memory
+            names[name] = name_id
+            if table in self.lru_tables and len(names) > self.lru_size:
+                names.popitem(last=False)
+
+            return name_id
@@ -1,8 +1,136 @@
+import threading
+from time import time
+from queue import Queue, Empty
 import pymysql.cursors
 
+
+class ConnectionPool ():
+
+    def __init__ (self, server:str, database:str, username:str, password:str,
+                  size:int=5, max_lifetime:int=3600, timeout:float=600):
+        """ Pool of open mysql connections, shared by all MySQL instances
+            (and threads) that use the same database
+
+        Args:
+            server (str): server host
+            database (str): database name
+            username (str): database username
+            password (str): database password
+            size (int, optional): max open connections. Defaults to 5.
+            max_lifetime (int, optional): seconds to reuse a connection
+                before open a new one. Defaults to 3600.
+            timeout (float, optional): max seconds to wait for an idle
+                connection when the pool is full. Defaults to 600
+                (0 to wait forever).
+        """
+
+        self.server = server
+        self.database = database
+        self.username = username
+        self.password = password
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+
+        self.idle_connections = Queue()
+        self.connections_num = 0
+        self.lock = threading.Lock()
+
+    def __connect__ (self) -> pymysql.connections.Connection:
+        """ Open a new connection
+
+        Returns:
+            pymysql.connections.Connection: new connection
+        """
+
+        connection = pymysql.connect(host=self.server,
+                                     user=self.username,
+                                     database=self.database,
+                                     passwd=self.password,
+                                     cursorclass=pymysql.cursors.DictCursor)
+        connection.created_at = time()
+
+        return connection
+
+    def get (self) -> pymysql.connections.Connection:
+        """ Get an idle connection (wait for one when the pool is full)
+
+        Raises:
+            TimeoutError: no connection released in timeout seconds
+
+        Returns:
+            pymysql.connections.Connection: healthy connection
+        """
+
+        # Reuse idle connection, or open a new one if pool is not full
+        try:
+            connection = self.idle_connections.get_nowait()
+        except Empty:
+            with self.lock:
+                can_connect = self.connections_num < self.size
+                if can_connect:
+                    self.connections_num += 1
+            if can_connect:
+                try:
+                    return self.__connect__()
+                except Exception as err:
+                    with self.lock:
+                        self.connections_num -= 1
+                    raise err
+            try:
+                connection = self.idle_connections.get(timeout=self.timeout or None)
+            except Empty:
+                raise TimeoutError(
+                    f"no mysql connection released in {self.timeout} seconds "
+                    f"(all {self.size} connections of the pool in use)"
+                )
+
+        try:
+            # Replace old connections
+            if time() - connection.created_at > self.max_lifetime:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                connection = self.__connect__()
+
+            # Validate connection is alive (reconnect if not)
+            connection.ping(reconnect=True)
+        except Exception as err:
+
+            # Free the connection slot (the connection is lost)
+            try:
+                connection.close()
+            except Exception:
+                pass
+            with self.lock:
+                self.connections_num -= 1
+            raise err
+
+        return connection
+
+    def put (self, connection: pymysql.connections.Connection):
+        """ Return a connection to the pool
+
+        Args:
+            connection (pymysql.connections.Connection): connection to release
+        """
+
+        self.idle_connections.put(connection)
+
+
 class MySQL ():
 
-    def __init__ (self, server:str, database:str, username:str, password:str):
+    # Connection pools by database
+    pools = {}
+    pools_lock = threading.Lock()
+
+    # Insert statements by table and columns
+    insert_templates = {}
+
+    def __init__ (self, server:str, database:str, username:str, password:str,
+                  pool_size:int=5, pool_lifetime:int=3600, pool_timeout:float=600,
+                  shared_pool:bool=True):
         """ Connect with mysql db
 
         Args:
@@ -10,6 +138,16 @@ class MySQL ():
             database (str): database name
             username (str): database username
             password (str): database password
+            pool_size (int, optional): max open connections (shared by
+                all instances). Defaults to 5.
+            pool_lifetime (int, optional): seconds to reuse each connection.
+                Defaults to 3600.
+            pool_timeout (float, optional): max seconds to wait for a
+                connection when all are in use. Defaults to 600 (0 to wait
+                forever).
+            shared_pool (bool, optional): use the pool shared by all instances.
+                If False, use an own pool of pool_size connections, that
+                can not be exhausted by other instances. Defaults to True.
         """
 
         self.server = server
@@ -19,8 +157,31 @@ class MySQL ():
         
         self.connection = None
         self.cursor = None
+        self.statements_count = 0
+
+        # Open transaction managed by the caller (keep connection on errors)
+        self.in_transaction = False
 
-    def run_sql (self, sql:str, auto_commit:bool=True, raise_errors:bool=True) -> list:
+        # Get own connection pool
+        if not shared_pool:
+            self.pool = ConnectionPool(
+                server, database, username, password,
+                pool_size, pool_lifetime, pool_timeout
+            )
+            return
+
+        # Get shared connection pool
+        pool_key = (server, database, username)
+        with MySQL.pools_lock:
+            if pool_key not in MySQL.pools:
+                MySQL.pools[pool_key] = ConnectionPool(
+                    server, database, username, password,
+                    pool_size, pool_lifetime, pool_timeout
+                )
+            self.pool = MySQL.pools[pool_key]
+
+    def run_sql (self, sql:str, auto_commit:bool=True, raise_errors:bool=True,
+                 params:tuple=None) -> list:
         """ Exceute sql code
             Run sql code in the current data base, and commit it
             
@@ -28,32 +189,26 @@ class MySQL ():
             sql (str): sql code to run
             auto_commit (bool, optional): commit changes. Defaults to True.
             raise_errors (bool, optional): raise errors running sql. Defaults to False.
+            params (tuple, optional): values for %s placeholders. Defaults to None.
             
         Returns:
             list: results of the sql code (like select)
         """
         
-        # Validate if connection is open
-        if not self.connection or not self.connection.open:
-            
-            # Connect and get cursor
-            self.connection = pymysql.connect(host=self.server,
-                                        user=self.username,
-                                        database=self.database,
-                                        passwd=self.password,
-                                        cursorclass=pymysql.cursors.DictCursor)
+        # Get connection from pool
+        if not self.connection:
+            self.connection = self.pool.get()
 
         self.cursor = self.connection.cursor()
-        
-        # Replce "None" columns to "NULL"
-        sql = sql.replace ('"None"', 'NULL').replace("None", "NULL")
 
         # Try to run sql
+        self.statements_count += 1
         try:
-            self.cursor.execute (sql)
+            self.cursor.execute (sql, params)
         except Exception as err:
 
             if raise_errors:
+                self.__release_on_error__()
                 raise err
             else:
                 print(err, sql)
@@ -72,30 +227,96 @@ class MySQL ():
             
         return results
     
-    def get_clean_text (self, text:str, keep:list=[], add_quotes=True) -> str():
-        
-        # Fix none values
-        if not text:
-            return "NULL"
-        
-        chars = [";", "--", "\b", "\r", "\t", "\n", "\f", "\v", "\0", "'", '"', "\\"]
-        
-        # Ignore chats to keep
-        for char in keep:
-            chars.remove (char)
-        
-        for char in chars:
-            text = text.replace(char, "")
-        
-        if add_quotes:
-            return f'"{text}"'
-        else:
-            return text
-    
-    def commit_close (self): 
-        """ Commit changes and close connection """
-        
-        self.connection.commit()
-        self.connection.close()
-        
-        
\ No newline at end of file
+    def run_many (self, sql:str, rows:list, batch_size:int=500, raise_errors:bool=True):
+        """ Execute a parameterized insert (with %s placeholders) for many rows,
+            sending each batch as a single multi-row INSERT (without commit)
+
+        Args:
+            sql (str): sql code to run, like "INSERT INTO t (a, b) values (%s, %s)"
+            rows (list): values of each row (tuples)
+            batch_size (int, optional): rows sent in each statement. Defaults to 500.
+            raise_errors (bool, optional): raise errors running sql. Defaults to True.
+        """
+
+        if not rows:
+            return
+
+        # Get connection from pool
+        if not self.connection:
+            self.connection = self.pool.get()
+
+        self.cursor = self.connection.cursor()
+
+        for batch_start in range(0, len(rows), batch_size):
+            batch = rows[batch_start:batch_start + batch_size]
+
+            # Try to run sql
+            self.statements_count += 1
+            try:
+                self.cursor.executemany (sql, batch)
+            except Exception as err:
+
+                if raise_errors:
+                    self.__release_on_error__()
+                    raise err
+                else:
+                    print(err, sql)
+
+    def __release_on_error__ (self):
+        """ Discard changes and return the connection to the pool after a
+            failed statement (except inside a transaction, discarded by its owner)
+        """
+
+        if self.in_transaction:
+            return
+
+        try:
+            self.rollback()
+        except Exception:
+            pass
+        self.close()
+
+    def get_insert_sql (self, table:str, columns:list) -> str:
+        """ Get parameterized insert statement (cached by table and columns)
+
+        Args:
+            table (str): table name
+            columns (list): columns names
+
+        Returns:
+            str: sql code, like "INSERT INTO t (a, b) values (%s, %s)"
+        """
+
+        template_key = (table, tuple(columns))
+        sql = MySQL.insert_templates.get(template_key)
+        if not sql:
+            placeholders = ", ".join(["%s"] * len(columns))
+            sql = f"INSERT INTO {table} ({', '.join(columns)}) values ({placeholders})"
+            MySQL.insert_templates[template_key] = sql
+
+        return sql
+
+    def commit (self):
+        """ Commit changes (keep connection) """
+
+        if self.connection:
+            self.connection.commit()
+
+    def rollback (self):
+        """ Discard changes (keep connection) """
+
+        if self.connection:
+            self.connection.rollback()
+
+    def close (self):
+        """ Return connection to the pool """
+
+        if self.connection:
+            self.pool.put(self.connection)
+            self.connection = None
+
+    def commit_close (self):
+        """ Commit changes and return connection to the pool """
+
+        self.commit()
+        self.close()
@@ -0,0 +1,224 @@
+import threading
+from queue import Queue, Empty
+from database.db import Database
+from timing import timer
+
+
+class DatabaseWriter ():
+
+    def __init__(self, database: Database, queue_size: int = 0):
+        """ Run database saves in a background thread (write-behind),
+            so scraping continues while the previous data is saved
+
+        Args:
+            database (Database): database instance (only used by the writer)
+            queue_size (int, optional): max pending saves, scraping waits
+                when the queue is full. Defaults to 0 (no thread, save
+                synchronously).
+        """
+
+        self.database = database
+        self.queue_size = queue_size
+
+        self.errors = Queue()
+        self.lost_tickers = Queue()
+        self.submitted_ticker = ""
+        self.ticker_name = ""
+        self.ticker_failed = False
+
+        # Start writer thread
+        self.tasks = None
+        self.thread = None
+        if self.queue_size > 0:
+            self.tasks = Queue(maxsize=queue_size)
+            self.thread = threading.Thread(
+                target=self.__run__,
+                name="database_writer",
+                daemon=True,
+            )
+            self.thread.start()
+
+    def __execute__(self, task: tuple):
+        """ Run a database task and save errors
+
+        Args:
+            task (tuple): task kind, ticker name, database method name and args
+        """
+
+        kind, ticker_name, method_name, args = task
+
+        if kind == "begin":
+            self.ticker_name = ticker_name
+            self.ticker_failed = False
+
+        # Skip the rest of a failed ticker (already discarded)
+        elif self.ticker_failed and kind != "flush":
+            return
+
+        # Optional sections can be discarded alone
+        optional = kind == "save_optional" and self.database.in_transaction
+
+        try:
+            with timer.span(ticker_name, method_name, database=self.database):
+                if optional:
+                    self.database.begin_section()
+                getattr(self.database, method_name)(*args)
+        except Exception as err:
+            self.errors.put((ticker_name, method_name, err))
+
+            # Discard only the section changes (keep the ticker)
+            if kind == "save_optional":
+                try:
+                    if optional:
+                        self.database.abort_section()
+                    return
+                except Exception as abort_err:
+                    self.errors.put((ticker_name, "abort_section", abort_err))
+
+            # Discard all ticker changes
+            if kind in ["begin", "save", "save_optional"] and self.database.in_transaction:
+                self.ticker_failed = True
+                try:
+                    self.database.abort_ticker()
+                except Exception as abort_err:
+                    self.errors.put((ticker_name, "abort_ticker", abort_err))
+
+    def __run__(self):
+        """ Run tasks from queue until close """
+
+        while True:
+            task = self.tasks.get()
+            try:
+                if task is None:
+                    break
+                self.__execute__(task)
+                self.__collect_lost_tickers__()
+            finally:
+                self.tasks.task_done()
+
+    def __submit__(self, task: tuple):
+        """ Send task to writer thread (wait if queue is full) or run it
+
+        Args:
+            task (tuple): task kind, ticker name, database method name and args
+        """
+
+        if self.thread:
+            self.tasks.put(task)
+        else:
+            self.__execute__(task)
+            self.__collect_lost_tickers__()
+
+    def __collect_lost_tickers__(self):
+        """ Move the tickers of the lost groups from the database (only used
+            by the writer thread) to the shared queue
+        """
+
+        while self.database.lost_tickers:
+            self.lost_tickers.put(self.database.lost_tickers.pop(0))
+
+    def begin_ticker(self, ticker_name: str, ticker_key: str = ""):
+        """ Start the transaction of a ticker
+
+        Args:
+            ticker_name (str): ticker name (for errors)
+            ticker_key (str, optional): ticker key (for lost tickers).
+                Defaults to "".
+        """
+
+        self.submitted_ticker = ticker_name
+        self.__submit__(("begin", ticker_name, "begin_ticker", (ticker_key,)))
+
+    def save(self, method_name: str, *args):
+        """ Save data with a Database method, like save("save_news_data", news_data)
+
+        Args:
+            method_name (str): Database method name
+        """
+
+        self.__submit__(("save", self.submitted_ticker, method_name, args))
+
+    def save_optional(self, method_name: str, *args):
+        """ Save data of an optional section: if it fails, only the section
+            is discarded and the rest of the ticker is saved
+
+        Args:
+            method_name (str): Database method name
+        """
+
+        self.__submit__(("save_optional", self.submitted_ticker, method_name, args))
+
+    def end_ticker(self):
+        """ End (and maybe commit) the transaction of the current ticker """
+
+        self.__submit__(("end", self.submitted_ticker, "end_ticker", ()))
+
+    def abort_ticker(self):
+        """ Discard the changes of the current ticker """
+
+        self.__submit__(("abort", self.submitted_ticker, "abort_ticker", ()))
+
+    def flush(self):
+        """ Commit the last group of tickers, and wait until it is done """
+
+        self.__submit__(("flush", self.submitted_ticker, "flush", ()))
+        self.wait()
+
+    def get_errors(self) -> list:
+        """ Get (and forget) the errors found saving data
+
+        Returns:
+            list: errors
+
+            Structure:
+            [
+                (str (ticker name), str (method name), Exception),
+                ...
+            ]
+        """
+
+        errors = []
+        while True:
+            try:
+                errors.append(self.errors.get_nowait())
+            except Empty:
+                break
+
+        return errors
+
+    def get_lost_tickers(self) -> list:
+        """ Get (and forget) the tickers discarded with their group, because
+            the connection or the transaction was lost before commit
+
+        Returns:
+            list: tickers keys
+        """
+
+        lost_tickers = []
+        while True:
+            try:
+                lost_tickers.append(self.lost_tickers.get_nowait())
+            except Empty:
+                break
+
+        return lost_tickers
+
+    def wait(self):
+        """ Wait until all pending saves are done """
+
+        if self.thread:
+            self.tasks.join()
+
+    def close(self):
+        """ Save pending data, commit the last group and end writer thread """
+
+        if self.thread:
+            self.tasks.put(None)
+            self.thread.join()
+            self.thread = None
+
+        try:
+            self.database.flush()
+        except Exception as err:
+            self.errors.put((self.ticker_name, "flush", err))
+        self.__collect_lost_tickers__()
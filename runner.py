@@ -0,0 +1,531 @@
+import os
+import shutil
+import tempfile
+import threading
+from queue import Queue, Empty
+from time import time, sleep
+from logs import logger
+from timing import timer
+from scraping.web_scraping import WebScraping
+from scraping.scraper_dt import ScrapingDilutionTracker
+from scraping.watchdog import MemoryWatchdog
+from database.db import Database
+from database.writer import DatabaseWriter
+
+
+# Sections scraped after premarket, in order (get_<section>_data and save_<section>_data)
+SECTIONS = [
+    "historical",
+    "cash",
+    "extra",
+    "completed_offering",
+    "news",
+    "holders",
+    "filings",
+    "noncompliant",
+]
+
+# Sections that can fail without discarding the ticker
+OPTIONAL_SECTIONS = ["historical", "cash"]
+
+# Premarket status of the tickers finished without sections
+FINISHED_STATUS = ["not_found", "skipped"]
+
+
+def log_run(writer: DatabaseWriter, tricker_name: str, tricker_key: str,
+            status: str, premarket_id: int = None, incremental: bool = False):
+    """ Register the result of a ticker in the checkpoint, and in the run log
+        in incremental mode (own transaction)
+
+    Args:
+        writer (DatabaseWriter): database writer instance
+        tricker_name (str): company name (from tickers.csv)
+        tricker_key (str): company tricker (from tickers.csv)
+        status (str): skipped, not_found or error
+        premarket_id (int, optional): last premarket saved. Defaults to None.
+        incremental (bool, optional): save in run log. Defaults to False.
+    """
+
+    writer.begin_ticker(tricker_name, tricker_key)
+    if incremental:
+        writer.save("save_run_log", tricker_key, status, premarket_id)
+    if status in FINISHED_STATUS:
+        writer.save("save_checkpoint", tricker_key, {"premarket": status}, premarket_id)
+    writer.end_ticker()
+
+
+def is_ticker_updated(premarket_data: dict, last_update: dict) -> bool:
+    """ Validate if the ticker changed since the last time it was saved
+
+    Args:
+        premarket_data (dict): premarket data (from get_premarket_data)
+        last_update (dict): last update saved (from get_tickers_updates)
+
+    Returns:
+        bool: True if the ticker must be scraped again
+    """
+
+    if not last_update or not premarket_data["update_info"]:
+        return True
+
+    return last_update["update_info"] != premarket_data["update_info"] \
+        or last_update["header_hash"] != premarket_data["header_hash"]
+
+
+def get_pending_sections(ticker_checkpoint: dict) -> list:
+    """ Get the sections of a ticker not saved yet in the resumed run
+
+    Args:
+        ticker_checkpoint (dict): sections status of the ticker (from get_checkpoint)
+
+    Returns:
+        list: sections to scrape (all if the ticker was not saved, [] if finished)
+    """
+
+    premarket_checkpoint = ticker_checkpoint.get("premarket")
+    if not premarket_checkpoint:
+        return SECTIONS
+    if premarket_checkpoint["status"] in FINISHED_STATUS:
+        return []
+
+    pending_sections = []
+    for section in SECTIONS:
+        section_checkpoint = ticker_checkpoint.get(section)
+        if not section_checkpoint or section_checkpoint["status"] != "done":
+            pending_sections.append(section)
+
+    return pending_sections
+
+
+def scrape_section(scraper: ScrapingDilutionTracker, section: str,
+                   tricker_key: str, company_filings: dict = None):
+    """ Scrape a secondary section of the current company
+
+    Args:
+        scraper (ScrapingDilutionTracker): scraper with the company loaded
+        section (str): section name (from SECTIONS)
+        tricker_key (str): company tricker (from tickers.csv)
+        company_filings (dict, optional): last filings saved of the company
+            (from get_last_filings). Defaults to None.
+
+    Returns:
+        any: section data
+    """
+
+    logger.info (f"scraping {section.replace('_', ' ')} data...")
+
+    # Only new filings (after the last filings saved)
+    if section == "filings":
+        if company_filings:
+            return scraper.get_filings_data(company_filings["date"],
+                                            company_filings["links"])
+        return scraper.get_filings_data()
+
+    if section == "noncompliant":
+        return scraper.get_noncompliant_data (tricker_key.lower().strip())
+
+    return getattr(scraper, f"get_{section}_data")()
+
+
+def scrape_ticker(scraper: ScrapingDilutionTracker, writer: DatabaseWriter,
+                  tricker_name: str, tricker_key: str, last_updates: dict = None,
+                  checkpoint: dict = None, last_filings: dict = None):
+    """ Scrape all sections of a company and send them to the database writer
+
+    Args:
+        scraper (ScrapingDilutionTracker): logged scraper instance
+        writer (DatabaseWriter): database writer instance
+        tricker_name (str): company name (from tickers.csv)
+        tricker_key (str): company tricker (from tickers.csv)
+        last_updates (dict, optional): last update saved of each ticker
+            (from get_tickers_updates). Skip the tickers without changes.
+            Defaults to None (scrape all).
+        checkpoint (dict, optional): sections saved of each ticker in the
+            resumed run (from get_checkpoint). Skip the sections already
+            saved. Defaults to None (scrape all).
+        last_filings (dict, optional): last filings saved of each company
+            (from get_last_filings). Stop the filings at the last one saved.
+            Defaults to None (last 10 days).
+    """
+
+    incremental = last_updates is not None
+
+    # Get pending sections of the resumed run
+    sections = SECTIONS
+    premarket_id = None
+    if checkpoint is not None:
+        ticker_checkpoint = checkpoint.get(tricker_key, {})
+        sections = get_pending_sections(ticker_checkpoint)
+        if not sections:
+            logger.info (f"\n>>> {tricker_name} already saved, skipped")
+            return
+        if "premarket" in ticker_checkpoint:
+            premarket_id = ticker_checkpoint["premarket"]["premarket_id"]
+
+    logger.info (f"\n>>> Scraping {tricker_name}...")
+
+    # Load and get main data
+    timer.count_commands(scraper.driver)
+    with timer.span(tricker_name, "load_company", scraper.driver):
+        scraper.load_company(tricker_key)
+
+    last_update = None
+    if incremental:
+        last_update = last_updates.get(tricker_key)
+
+    # Retry only failed sections, linked to the premarket saved before
+    # (company name is not scraped again: filings of the last 10 days)
+    company_filings = None
+    if premarket_id:
+        logger.info (f"\t* retrying {', '.join(sections)}")
+        writer.begin_ticker(tricker_name, tricker_key)
+        writer.save("resume_premarket", premarket_id)
+
+    else:
+
+        logger.info("scraping premarket data...")
+        with timer.span(tricker_name, "get_premarket_data", scraper.driver):
+            premarket_data = scraper.get_premarket_data()
+
+        # Validate data found
+        if not premarket_data["found"]:
+            logger.info (f"\t* {premarket_data['dilution_data']}")
+            log_run(writer, tricker_name, tricker_key, "not_found",
+                    incremental=incremental)
+            return
+
+        # Skip tickers without changes (incremental mode)
+        if incremental and not is_ticker_updated(premarket_data, last_update):
+            logger.info ("\t* no changes since last run, skipped")
+            log_run(writer, tricker_name, tricker_key, "skipped",
+                    last_update["premarket_id"], incremental)
+            return
+
+        # Last filings saved of the company (high-water mark)
+        if last_filings:
+            company_filings = last_filings.get(premarket_data["name"])
+
+        # Save all sections in a single transaction
+        writer.begin_ticker(tricker_name, tricker_key)
+        writer.save("save_premarket_data", premarket_data)
+        if incremental:
+            writer.save("save_ticker_update", tricker_key, premarket_data)
+
+    # Scraper secondary data
+    sections_status = {} if premarket_id else {"premarket": "done"}
+    try:
+
+        for section in sections:
+
+            try:
+                with timer.span(tricker_name, f"get_{section}_data", scraper.driver):
+                    section_data = scrape_section(scraper, section, tricker_key,
+                                                  company_filings)
+            except Exception as err:
+                if section not in OPTIONAL_SECTIONS:
+                    raise err
+                print (f"\t{section} data not found")
+                sections_status[section] = "failed"
+                continue
+
+            # Failed saves of optional sections do not discard the ticker
+            if section in OPTIONAL_SECTIONS:
+                writer.save_optional(f"save_{section}_data", section_data)
+            else:
+                writer.save(f"save_{section}_data", section_data)
+            sections_status[section] = "done"
+
+        # Save sections status with the ticker data
+        writer.save("save_checkpoint", tricker_key, sections_status)
+
+    except Exception as err:
+        writer.abort_ticker()
+        if incremental:
+            log_run(writer, tricker_name, tricker_key, "error", incremental=True)
+        raise err
+    else:
+        writer.end_ticker()
+
+
+def log_writer_errors(writer: DatabaseWriter):
+    """ Show errors found saving data in background
+
+    Args:
+        writer (DatabaseWriter): database writer instance
+    """
+
+    for tricker_name, method_name, err in writer.get_errors():
+        logger.error(f'Error saving {tricker_name} ({method_name}): {err}')
+
+
+def requeue_lost_tickers(writer: DatabaseWriter, tickers_queue: Queue,
+                         tickers: list, requeued: set) -> int:
+    """ Send again to the queue the tickers discarded with a lost group
+        commit (connection dropped or deadlock). Their data and checkpoints
+        were rolled back, so they are scraped again (only once)
+
+    Args:
+        writer (DatabaseWriter): database writer instance
+        tickers_queue (Queue): pending tickers (alias, key)
+        tickers (list): all tickers of the run (alias, key)
+        requeued (set): keys of the tickers already sent again (updated)
+
+    Returns:
+        int: tickers sent again
+    """
+
+    lost_tickers = writer.get_lost_tickers()
+    if not lost_tickers:
+        return 0
+
+    tickers_by_key = {tricker_key: (tricker_name, tricker_key)
+                      for tricker_name, tricker_key in tickers}
+
+    requeued_num = 0
+    for tricker_key in lost_tickers:
+        if tricker_key in requeued or tricker_key not in tickers_by_key:
+            logger.error(f'{tricker_key} not saved (group commit lost)')
+            continue
+        requeued.add(tricker_key)
+        tickers_queue.put(tickers_by_key[tricker_key])
+        requeued_num += 1
+
+    if requeued_num:
+        logger.warning(f'{requeued_num} tickers of a lost group commit, scraping them again')
+
+    return requeued_num
+
+
+def check_browser(scraper: ScrapingDilutionTracker, watchdog: MemoryWatchdog,
+                  tricker_name: str) -> bool:
+    """ Recycle chrome after a ticker if the watchdog limits are reached
+
+    Args:
+        scraper (ScrapingDilutionTracker): logged scraper instance
+        watchdog (MemoryWatchdog): chrome limits of the scraper
+        tricker_name (str): last company scraped (for timing report)
+
+    Returns:
+        bool: False if chrome or the login failed after recycle chrome
+    """
+
+    if not watchdog.is_enabled():
+        return True
+
+    # Crashed or hung tab: recycle too
+    try:
+        reason = watchdog.check(scraper)
+    except Exception as err:
+        reason = f"memory not available: {err}"
+    if not reason:
+        return True
+
+    logger.info (f"Recycling chrome ({reason})...")
+    try:
+        with timer.span(tricker_name, "recycle_browser"):
+            is_logged = scraper.recycle_browser()
+    except Exception as err:
+        logger.error(f'Error recycling chrome: {err}')
+        return False
+    watchdog.reset()
+
+    if not is_logged:
+        logger.error('Login failed after recycling chrome')
+    return is_logged
+
+
+class WorkerPool ():
+
+    def __init__(self, chrome_folder: str, workers_num: int,
+                 noncompliant_ttl: int = 0, min_interval: float = 0,
+                 write_behind: int = 0,
+                 last_updates: dict = None, checkpoint: dict = None,
+                 last_filings: dict = None, profiler=None, blocked_urls: list = [], recycle_tickers: int = 0,
+                 recycle_rss_mb: float = 0, recycle_heap_mb: float = 0):
+        """ Scrape tickers with multiple chrome instances in parallel
+
+        Args:
+            chrome_folder (str): chrome data folder path (cloned for each worker)
+            workers_num (int): number of chrome instances
+            noncompliant_ttl (int, optional): seconds to keep the nasdaq
+                noncompliant list in memory. Defaults to 0 (whole run).
+            min_interval (float, optional): min seconds between two tickers
+                starts (from all workers), to respect the site rate limit.
+                Defaults to 0.
+            write_behind (int, optional): max pending saves of each worker
+                database writer thread. Defaults to 0 (save synchronously).
+            last_updates (dict, optional): last update saved of each ticker,
+                to skip the tickers without changes. Defaults to None (scrape all).
+            checkpoint (dict, optional): sections saved of each ticker in
+                the resumed run. Defaults to None (scrape all).
+            last_filings (dict, optional): last filings saved of each company,
+                to scrape only new filings. Defaults to None (last 10 days).
+            profiler (CommandProfiler, optional): profiler of the webdriver
+                commands (shared by all workers). Defaults to None.
+            blocked_urls (list, optional): url patterns to not load.
+                Defaults to [] (load all).
+            recycle_tickers (int, optional): tickers scraped by each chrome
+                instance before restart it. Defaults to 0 (no limit).
+            recycle_rss_mb (float, optional): max memory of each chrome
+                instance before restart it. Defaults to 0 (no limit).
+            recycle_heap_mb (float, optional): max js heap of each chrome
+                instance before restart it. Defaults to 0 (no limit).
+        """
+
+        self.chrome_folder = chrome_folder
+        self.workers_num = workers_num
+        self.noncompliant_ttl = noncompliant_ttl
+        self.min_interval = min_interval
+        self.write_behind = write_behind
+        self.last_updates = last_updates
+        self.checkpoint = checkpoint
+        self.last_filings = last_filings
+        self.profiler = profiler
+        self.blocked_urls = blocked_urls
+        self.recycle_tickers = recycle_tickers
+        self.recycle_rss_mb = recycle_rss_mb
+        self.recycle_heap_mb = recycle_heap_mb
+
+        # Shared work queue and rate limit
+        self.tickers = []
+        self.tickers_queue = Queue()
+        self.requeued = set()
+        self.rate_lock = threading.Lock()
+        self.last_start = 0
+
+        self.clones_folder = None
+
+    def __clone_chrome_folder__(self, worker_index: int) -> str:
+        """ Copy chrome data folder for a worker (without profile locks and caches)
+
+        Args:
+            worker_index (int): worker number
+
+        Returns:
+            str: cloned chrome data folder path
+        """
+
+        clone_folder = os.path.join(self.clones_folder, f"worker_{worker_index}")
+        shutil.copytree(
+            self.chrome_folder,
+            clone_folder,
+            ignore=shutil.ignore_patterns(
+                "Singleton*", "lockfile", "*.lock",
+                "Cache*", "Code Cache", "GPUCache", "*ShaderCache",
+            ),
+            dirs_exist_ok=True,
+        )
+
+        return clone_folder
+
+    def __wait_rate_limit__(self):
+        """ Wait until the min interval from the last ticker start is reached """
+
+        if self.min_interval <= 0:
+            return
+
+        with self.rate_lock:
+            wait_time = self.last_start + self.min_interval - time()
+            if wait_time > 0:
+                sleep(wait_time)
+            self.last_start = time()
+
+    def __worker__(self, worker_index: int):
+        """ Scrape tickers from queue until is empty
+
+        Args:
+            worker_index (int): worker number
+        """
+
+        chrome_folder = self.__clone_chrome_folder__(worker_index)
+        scraper = ScrapingDilutionTracker(
+            chrome_folder,
+            self.noncompliant_ttl,
+            start_killing=False,
+            profiler=self.profiler,
+            blocked_urls=self.blocked_urls,
+        )
+        writer = DatabaseWriter(Database(), self.write_behind)
+        watchdog = MemoryWatchdog(self.recycle_tickers, self.recycle_rss_mb,
+                                  self.recycle_heap_mb)
+
+        try:
+
+            # End worker if login failed (tickers stay in queue for the others)
+            if not scraper.login():
+                logger.error(f'Worker {worker_index}: login failed')
+                return
+
+            while True:
+
+                try:
+                    tricker_name, tricker_key = self.tickers_queue.get_nowait()
+                except Empty:
+
+                    # Commit the last group (scrape again its tickers if it is lost)
+                    writer.flush()
+                    log_writer_errors(writer)
+                    if requeue_lost_tickers(writer, self.tickers_queue,
+                                            self.tickers, self.requeued):
+                        continue
+                    break
+
+                self.__wait_rate_limit__()
+
+                try:
+                    with timer.span(tricker_name, "ticker", scraper.driver):
+                        scrape_ticker(scraper, writer, tricker_name, tricker_key,
+                                      self.last_updates, self.checkpoint,
+                                      self.last_filings)
+                except Exception as err:
+                    logger.error(f'Worker {worker_index}: error scraping {tricker_name}: {err}')
+
+                log_writer_errors(writer)
+                requeue_lost_tickers(writer, self.tickers_queue, self.tickers,
+                                     self.requeued)
+
+                # End worker if the session is lost (tickers stay in queue for the others)
+                if not check_browser(scraper, watchdog, tricker_name):
+                    return
+
+        finally:
+            writer.close()
+            log_writer_errors(writer)
+            scraper.end_browser()
+
+    def run(self, tickers: list):
+        """ Scrape all tickers with the workers
+
+        Args:
+            tickers (list): tickers to scrape (alias, key)
+        """
+
+        self.tickers = tickers
+        for ticker in tickers:
+            self.tickers_queue.put(ticker)
+
+        # Close chrome once, before cloning profiles
+        WebScraping.kill_chrome()
+        self.clones_folder = tempfile.mkdtemp(prefix="dilutiontracker_chrome_")
+
+        try:
+
+            threads = []
+            for worker_index in range(self.workers_num):
+                thread = threading.Thread(
+                    target=self.__worker__,
+                    args=(worker_index,),
+                    name=f"worker_{worker_index}",
+                )
+                thread.start()
+                threads.append(thread)
+
+            for thread in threads:
+                thread.join()
+
+            if not self.tickers_queue.empty():
+                logger.error(f'{self.tickers_queue.qsize()} tickers not scraped (all workers ended)')
+
+        finally:
+            # Delete cloned profiles (also after errors or ctrl+c)
+            shutil.rmtree(self.clones_folder, ignore_errors=True)
@@ -0,0 +1,275 @@
+import os
+import re
+import sys
+import threading
+from time import perf_counter
+
+# Element reference key in webdriver responses (w3c)
+ELEMENT_KEY = "element-6066-11e4-a52f-4f54b6f1bdc0"
+
+
+class CommandProfiler ():
+
+    def __init__(self, n_plus_one_min: int = 5):
+        """ Count and time each webdriver command (http round trip to chromedriver)
+            by calling method and by css selector
+
+        Args:
+            n_plus_one_min (int, optional): min different selectors of the
+                same pattern (like "tr:nth-child(n) td") sent from the same
+                method, to flag it as a n+1 loop. Defaults to 5.
+        """
+
+        self.n_plus_one_min = n_plus_one_min
+        self.scraping_folder = os.path.dirname(os.path.abspath(__file__))
+
+        self.stacks = {}
+        self.callers = {}
+        self.selectors = {}
+        self.patterns = {}
+        self.lock = threading.Lock()
+
+    def attach(self, driver):
+        """ Profile all the commands sent by a webdriver
+
+        Args:
+            driver (webdriver.Chrome): selenium driver
+        """
+
+        elements_selectors = {}
+        execute = driver.execute
+
+        def execute_profiled(command, params=None):
+
+            start = perf_counter()
+            response = execute(command, params)
+            seconds = perf_counter() - start
+
+            selector = self.__get_selector__(command, params, response, elements_selectors)
+            self.__add_command__(command, selector, seconds)
+
+            return response
+
+        driver.execute = execute_profiled
+
+    def __get_selector__(self, command: str, params: dict, response: dict,
+                         elements_selectors: dict) -> str:
+        """ Get the css selector of a command (saving the selectors of found elements)
+
+        Args:
+            command (str): webdriver command name
+            params (dict): command params
+            response (dict): command response
+            elements_selectors (dict): selector of each element id found
+
+        Returns:
+            str: css selector, or "" for commands without selector
+        """
+
+        params = params or {}
+
+        # Elements ids change after leaving the page
+        if command == "get":
+            elements_selectors.clear()
+            return ""
+
+        if command in ["findElement", "findElements", "findChildElement", "findChildElements"]:
+            selector = params.get("value", "")
+            if command.startswith("findChild"):
+                selector = f'{elements_selectors.get(params.get("id"), "?")} {selector}'
+
+            # Save selector of the found elements
+            value = (response or {}).get("value")
+            elements = value if isinstance(value, list) else [value]
+            for element in elements:
+                if isinstance(element, dict) and ELEMENT_KEY in element:
+                    elements_selectors[element[ELEMENT_KEY]] = selector
+
+            return selector
+
+        if "id" in params:
+            return elements_selectors.get(params["id"], "")
+
+        return ""
+
+    def __get_stack__(self) -> list:
+        """ Get the methods of the scraping package that sent the current command
+
+        Returns:
+            list: files and methods names, from outer to inner
+                like [("scraper_dt.py", "get_news_data"), ...]
+        """
+
+        stack = []
+        frame = sys._getframe(3)
+        while frame:
+            file_path = os.path.abspath(frame.f_code.co_filename)
+            file_name = os.path.basename(file_path)
+            if os.path.dirname(file_path) == self.scraping_folder \
+                    and file_name != "profiler.py":
+                stack.append((file_name, frame.f_code.co_name))
+            frame = frame.f_back
+
+        return list(reversed(stack))
+
+    def __add_command__(self, command: str, selector: str, seconds: float):
+        """ Save counter and time of a command
+
+        Args:
+            command (str): webdriver command name
+            selector (str): css selector of the command
+            seconds (float): command duration
+        """
+
+        stack = self.__get_stack__()
+
+        # Caller: inner method out of the generic WebScraping helpers
+        caller = stack[-1][1] if stack else "unknown"
+        for file_name, method in reversed(stack):
+            if file_name != "web_scraping.py":
+                caller = method
+                break
+
+        folded = ";".join([method for _, method in stack] + [command])
+        pattern = re.sub(r":nth-child\(\d+\)", ":nth-child(n)", selector)
+
+        with self.lock:
+
+            self.__add_counter__(self.stacks, folded, seconds)
+            self.__add_counter__(self.callers, caller, seconds)
+            if selector:
+                self.__add_counter__(self.selectors, selector, seconds)
+
+            # Different selectors of the same pattern (n+1 loops)
+            if pattern != selector:
+                pattern_data = self.patterns.setdefault((caller, pattern), {
+                    "count": 0,
+                    "seconds": 0,
+                    "selectors": set(),
+                })
+                pattern_data["count"] += 1
+                pattern_data["seconds"] += seconds
+                pattern_data["selectors"].add(selector)
+
+    def __add_counter__(self, counters: dict, key: str, seconds: float):
+        """ Add a command to a counter
+
+        Args:
+            counters (dict): counters by key
+            key (str): counter key
+            seconds (float): command duration
+        """
+
+        counter = counters.setdefault(key, {"count": 0, "seconds": 0})
+        counter["count"] += 1
+        counter["seconds"] += seconds
+
+    def __get_top__(self, counters: dict, top: int) -> list:
+        """ Get counters with more time
+
+        Args:
+            counters (dict): counters by key
+            top (int): max counters
+
+        Returns:
+            list: counters, like [{"name": str, "count": int, "seconds": float}, ...]
+        """
+
+        items = sorted(counters.items(), key=lambda item: item[1]["seconds"], reverse=True)
+        return [
+            {"name": key, "count": counter["count"], "seconds": round(counter["seconds"], 4)}
+            for key, counter in items[:top]
+        ]
+
+    def get_summary(self, top: int = 10) -> dict:
+        """ Get hottest callers and selectors, and n+1 loops
+
+        Args:
+            top (int, optional): max items of each list. Defaults to 10.
+
+        Returns:
+            dict: profiler summary
+
+            Structure:
+            {
+                "commands": int,
+                "seconds": float,
+                "callers": [{"name": str, "count": int, "seconds": float}, ...],
+                "selectors": [{"name": str, "count": int, "seconds": float}, ...],
+                "n_plus_one": [
+                    {
+                        "caller": str,
+                        "pattern": str,
+                        "selectors": int,
+                        "count": int,
+                        "seconds": float,
+                    },
+                    ...
+                ],
+            }
+        """
+
+        with self.lock:
+
+            n_plus_one = []
+            for (caller, pattern), pattern_data in self.patterns.items():
+                if len(pattern_data["selectors"]) < self.n_plus_one_min:
+                    continue
+                n_plus_one.append({
+                    "caller": caller,
+                    "pattern": pattern,
+                    "selectors": len(pattern_data["selectors"]),
+                    "count": pattern_data["count"],
+                    "seconds": round(pattern_data["seconds"], 4),
+                })
+            n_plus_one.sort(key=lambda item: item["seconds"], reverse=True)
+
+            return {
+                "commands": sum(counter["count"] for counter in self.callers.values()),
+                "seconds": round(sum(counter["seconds"] for counter in self.callers.values()), 4),
+                "callers": self.__get_top__(self.callers, top),
+                "selectors": self.__get_top__(self.selectors, top),
+                "n_plus_one": n_plus_one[:top],
+            }
+
+    def save_folded(self, file_path: str):
+        """ Save commands time by stack in folded format
+            (input of flamegraph.pl or speedscope), in microseconds
+
+        Args:
+            file_path (str): output file path
+        """
+
+        folder = os.path.dirname(file_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self.lock:
+            lines = [
+                f'{stack} {int(counter["seconds"] * 1000000)}'
+                for stack, counter in sorted(self.stacks.items())
+            ]
+
+        with open(file_path, "w") as file:
+            file.write("\n".join(lines) + "\n")
+
+    def log_summary(self, logger, top: int = 10):
+        """ Show hottest callers and selectors, and n+1 loops
+
+        Args:
+            logger (logging.Logger): logger instance
+            top (int, optional): max items of each list. Defaults to 10.
+        """
+
+        summary = self.get_summary(top)
+        logger.info(f'Webdriver commands: {summary["commands"]} in {summary["seconds"]}s')
+
+        for caller in summary["callers"]:
+            logger.info(f'\tcaller {caller["name"]}: {caller["count"]} commands, {caller["seconds"]}s')
+
+        for selector in summary["selectors"]:
+            logger.info(f'\tselector {selector["name"]}: {selector["count"]} commands, {selector["seconds"]}s')
+
+        for loop in summary["n_plus_one"]:
+            logger.info(f'\tn+1 in {loop["caller"]}: "{loop["pattern"]}" sent with '
+                        f'{loop["selectors"]} selectors, {loop["count"]} commands, {loop["seconds"]}s')
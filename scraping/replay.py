@@ -0,0 +1,272 @@
+import os
+import re
+import json
+import threading
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Tabs of the company page: button selector and fixture name
+TABS = {
+    "#result-tab-news": "news",
+    "#result-tab-inst-own": "holders",
+    "#result-tab-filings": "filings",
+}
+
+# Filings rows (same as ScrapingDilutionTracker.get_filings_data)
+FILINGS_ROWS = '.row > div:first-child .secFilingResultSingleContainer:first-child .secFilingTableWrapper > div'
+FILINGS_LINK = '> div'
+FILINGS_DATE = '.secFilingFiledAt'
+FILINGS_FETCH_MORE = '.secFilingFetchMoreRow'
+
+# Script added to the company page, to load the tabs from fixtures
+TABS_SCRIPT = """
+<script>
+    (() => {
+        const ticker = %s
+        const tabs = %s
+        document.addEventListener("click", async (event) => {
+            for (const [selector, tab] of Object.entries(tabs)) {
+                if (!event.target.closest(selector)) continue
+                const response = await fetch(`/replay/${ticker}/${tab}`)
+                const page = new DOMParser().parseFromString(await response.text(), "text/html")
+                document.body.replaceWith(document.importNode(page.body, true))
+                return
+            }
+        })
+    })()
+</script>
+"""
+
+
+def clean_html(html: str) -> str:
+    """ Remove scripts from page source (keep only the rendered dom)
+
+    Args:
+        html (str): page source
+
+    Returns:
+        str: page source without scripts
+    """
+
+    return re.sub(r"<script\b[^>]*>.*?</script>", "", html, flags=re.IGNORECASE | re.DOTALL)
+
+
+class PageRecorder ():
+
+    def __init__(self, fixtures_folder: str):
+        """ Save the pages used by the scraper (after each extraction)
+            to replay them offline
+
+        Args:
+            fixtures_folder (str): folder to save the pages
+        """
+
+        self.fixtures_folder = fixtures_folder
+        os.makedirs(os.path.join(fixtures_folder, "companies"), exist_ok=True)
+
+    def __save__(self, scraper, file_path: str):
+        """ Save current page of the scraper
+
+        Args:
+            scraper (ScrapingDilutionTracker): scraper instance
+            file_path (str): file path, relative to fixtures folder
+        """
+
+        file_path = os.path.join(self.fixtures_folder, file_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write(clean_html(scraper.driver.page_source))
+
+    def record_login(self, scraper):
+        """ Save home and app pages (logged session)
+
+        Args:
+            scraper (ScrapingDilutionTracker): scraper instance
+        """
+
+        scraper.set_page(scraper.pages["home"])
+        scraper.wait_ready("nav li")
+        self.__save__(scraper, "home.html")
+
+        scraper.set_page(f'{scraper.pages["home"]}/app')
+        scraper.wait_ready()
+        self.__save__(scraper, "app.html")
+
+    def record_noncompliant(self, scraper):
+        """ Save nasdaq noncompliant page (with all rows displayed)
+
+        Args:
+            scraper (ScrapingDilutionTracker): scraper instance
+        """
+
+        scraper.__load_noncompliant_index__()
+        self.__save__(scraper, "noncompliant.html")
+
+    def record_company(self, scraper, ticker: str):
+        """ Save company page and each tab state
+
+        Args:
+            scraper (ScrapingDilutionTracker): scraper instance
+            ticker (str): company ticker
+        """
+
+        company_folder = os.path.join("companies", ticker.lower())
+
+        # Main page, after the premarket, graphs and details extractions
+        scraper.load_company(ticker)
+        premarket_data = scraper.get_premarket_data()
+        if premarket_data["found"]:
+            for get_data in [scraper.get_historical_data, scraper.get_cash_data]:
+                try:
+                    get_data()
+                except Exception:
+                    pass
+            scraper.get_extra_data()
+            scraper.get_completed_offering_data()
+        self.__save__(scraper, os.path.join(company_folder, "company.html"))
+
+        if not premarket_data["found"]:
+            return
+
+        # Tabs
+        scraper.get_news_data()
+        self.__save__(scraper, os.path.join(company_folder, "news.html"))
+
+        scraper.get_holders_data()
+        self.__save__(scraper, os.path.join(company_folder, "holders.html"))
+
+        # Filings with the links of all the loaded rows resolved (without
+        # click handlers in replay, any last filing date can be replayed)
+        scraper.get_filings_data()
+        rows_indexes = scraper.driver.execute_script("""
+            const [selectorRows, selectorDate] = arguments
+            return [...document.querySelectorAll(selectorRows)]
+                .filter(row => row.querySelector(selectorDate)?.textContent.trim())
+                .map(row => [...row.parentElement.children].indexOf(row) + 1)
+        """, FILINGS_ROWS, FILINGS_DATE)
+        links = {}
+        for row_index in rows_indexes:
+            selector_link = f"{FILINGS_ROWS}:nth-child({row_index}) {FILINGS_LINK}"
+            links[row_index] = scraper.__get_filing_link__(selector_link)
+
+        scraper.driver.execute_script("""
+            const [selectorRows, selectorLink, selectorFetchMore, links] = arguments
+            for (const [rowIndex, link] of Object.entries(links)) {
+                const elem = document.querySelector(
+                    `${selectorRows}:nth-child(${rowIndex}) ${selectorLink}`
+                )
+                if (elem && link) elem.setAttribute("data-href", link)
+            }
+            document.querySelectorAll(selectorFetchMore).forEach(elem => elem.remove())
+        """, FILINGS_ROWS, FILINGS_LINK, FILINGS_FETCH_MORE, links)
+        self.__save__(scraper, os.path.join(company_folder, "filings.html"))
+
+
+class ReplayServer ():
+
+    def __init__(self, fixtures_folder: str, port: int = 0):
+        """ Local http server with the recorded pages, used instead of
+            dilution tracker and nasdaq pages
+
+        Args:
+            fixtures_folder (str): folder with the recorded pages
+            port (int, optional): server port. Defaults to 0 (random free port).
+        """
+
+        self.fixtures_folder = fixtures_folder
+
+        handler = self.__get_handler__()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        # Pages to use in the scraper
+        self.pages = {
+            "home": self.url,
+            "noncompliant": f"{self.url}/noncompliant",
+        }
+
+        self.thread = None
+
+    def __get_page__(self, path: str) -> str:
+        """ Get recorded page of an url path
+
+        Args:
+            path (str): url path
+
+        Returns:
+            str: page html (None if not recorded)
+        """
+
+        parts = [part for part in path.split("/") if part]
+
+        if not parts:
+            file_path = "home.html"
+        elif parts == ["app"]:
+            file_path = "app.html"
+        elif parts == ["noncompliant"]:
+            file_path = "noncompliant.html"
+        elif len(parts) == 3 and parts[:2] == ["app", "search"]:
+            file_path = os.path.join("companies", parts[2].lower(), "company.html")
+        elif len(parts) == 3 and parts[0] == "replay":
+            file_path = os.path.join("companies", parts[1].lower(), f"{parts[2]}.html")
+        else:
+            return None
+
+        file_path = os.path.join(self.fixtures_folder, file_path)
+        if not os.path.isfile(file_path):
+            return None
+
+        with open(file_path, encoding="utf-8") as file:
+            html = file.read()
+
+        # Load tabs from fixtures in company page
+        if parts[:2] == ["app", "search"]:
+            script = TABS_SCRIPT % (json.dumps(parts[2].lower()), json.dumps(TABS))
+            html = html.replace("</body>", f"{script}</body>", 1)
+
+        return html
+
+    def __get_handler__(self):
+        """ Get request handler class of the server
+
+        Returns:
+            class: request handler
+        """
+
+        replay_server = self
+
+        class ReplayHandler (BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                html = replay_server.__get_page__(urlparse(self.path).path)
+                if html is None:
+                    self.send_error(404)
+                    return
+
+                body = html.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return ReplayHandler
+
+    def start(self):
+        """ Start server in background thread """
+
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            name="replay_server",
+            daemon=True,
+        )
+        self.thread.start()
+
+    def stop(self):
+        """ Stop server """
+
+        self.server.shutdown()
+        self.server.server_close()
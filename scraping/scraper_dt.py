@@ -1,58 +1,212 @@
-from time import sleep
-from datetime import datetime as dt, timedelta
+import json
+import hashlib
+import threading
+from time import sleep, time
+from datetime import datetime as dt, timedelta, date
 from scraping.web_scraping import WebScraping
 
+# Resources not used by the scraper (url patterns, blocked with CDP)
+BLOCKED_URLS = [
+
+    # Images
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico",
+
+    # Web fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+
+    # Chat widget and analytics
+    "*intercom.io*", "*intercomcdn.com*", "*intercomassets.com*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*segment.com*", "*segment.io*",
+    "*mixpanel.com*", "*clarity.ms*",
+]
+
+
+def get_blocked_urls(allowed_urls: list = [], extra_urls: list = []) -> list:
+    """ Get url patterns to block (default profile, customized)
+
+    Args:
+        allowed_urls (list, optional): default patterns to not block. Defaults to [].
+        extra_urls (list, optional): patterns to block too. Defaults to [].
+
+    Returns:
+        list: url patterns
+    """
+
+    blocked_urls = [url for url in BLOCKED_URLS if url not in allowed_urls]
+    blocked_urls += [url for url in extra_urls if url not in blocked_urls]
+
+    return blocked_urls
+
 
 class ScrapingDilutionTracker (WebScraping):
 
-    def __init__(self, chrome_folder: str):
+    # Nasdaq noncompliant list, shared by all instances (workers)
+    noncompliant_index = None
+    noncompliant_loaded_at = None
+    noncompliant_lock = threading.Lock()
+
+    def __init__(self, chrome_folder: str, noncompliant_ttl: int = 0,
+                 start_killing: bool = True, profiler=None,
+                 headless: bool = False, blocked_urls: list = []):
         """ Connect to WebScraping class and start chrome instance
 
         Args:
             chrome_folder (str): chrome data folder path
+            noncompliant_ttl (int, optional): seconds to keep the nasdaq
+                noncompliant list in memory. Defaults to 0 (whole run).
+            start_killing (bool, optional): kill running chrome before start.
+                Defaults to True.
+            profiler (CommandProfiler, optional): profiler of the webdriver
+                commands. Defaults to None.
+            headless (bool, optional): hide chrome window. Defaults to False.
+            blocked_urls (list, optional): url patterns to not load
+                (from get_blocked_urls). Defaults to [] (load all).
         """
 
         # Scraping pages
         self.pages = {
-            "home": "https://dilutiontracker.com"
+            "home": "https://dilutiontracker.com",
+            "noncompliant": "https://listingcenter.nasdaq.com/noncompliantcompanylist.aspx",
         }
 
+        # Nasdaq noncompliant list, loaded once per run (or per ttl)
+        self.noncompliant_ttl = noncompliant_ttl
+
         # Start chrome instance with chrome data
         super().__init__(
             chrome_folder=chrome_folder,
-            start_killing=True,
+            start_killing=start_killing,
+            network_logs=True,
+            profiler=profiler,
+            headless=headless,
+            blocked_urls=blocked_urls,
         )
 
-    def __get_column_value__(self, column_height: float, graph_height: int,
-                             max_value: float) -> float:
-        """ Get column value from graph
+    def __get_chart_data__(self, chart: dict) -> dict:
+        """ Get bars and y axis ticks of a recharts graph in one script call
+
+        Args:
+            chart (dict): graph selectors
+                Structure:
+                {
+                    "columns_wrapper": str (each column),
+                    "column": str (bar inside each column),
+                    "axis": str (y axis),
+                    "extra_columns": {
+                        "str (name)": str (selector of extra bars),
+                        ...
+                    },
+                }
+
+        Returns:
+            dict: raw graph data (bars are None for empty columns)
+
+            Structure:
+            {
+                "bars": [{"name": str, "height": float, "y": float, "fill": str}, ...],
+                "extras": {
+                    "str (name)": [{"name": str, "height": float, "y": float, "fill": str}, ...],
+                    ...
+                },
+                "ticks": [{"value": float, "y": float, "height": float}, ...],
+            }
+        """
+
+        return self.driver.execute_script("""
+            const [chart] = arguments
+            const number = (value) => {
+                const parsed = parseFloat(value)
+                return isNaN(parsed) ? null : parsed
+            }
+            const getBar = (elem) => elem ? {
+                name: elem.getAttribute("name"),
+                height: number(elem.getAttribute("height")),
+                y: number(elem.getAttribute("y")),
+                fill: elem.getAttribute("fill"),
+            } : null
+
+            // Regular columns (keep empty columns to keep positions)
+            const bars = [...document.querySelectorAll(chart.columns_wrapper)]
+                .map(wrapper => getBar(wrapper.querySelector(chart.column)))
+
+            // Extra columns
+            const extras = {}
+            for (const [name, selector] of Object.entries(chart.extra_columns)) {
+                extras[name] = [...document.querySelectorAll(selector)].map(getBar)
+            }
+
+            // All y axis ticks (value and position)
+            const axis = document.querySelector(chart.axis)
+            const ticks = axis ? [...axis.querySelectorAll(".recharts-cartesian-axis-tick > text")]
+                .map(text => ({
+                    value: number(text.textContent),
+                    y: number(text.getAttribute("y")),
+                    height: number(text.getAttribute("height")),
+                })) : []
+
+            return {bars, extras, ticks}
+        """, chart)
+
+    def __get_chart_scale__(self, ticks: list) -> tuple:
+        """ Get graph scale with a linear fit of all the y axis ticks
+            (supports negative ranges)
 
         Args:
-            column_height (float): column height in px
-            graph_height (int): height of graph in px
-            max_value (float): max value of graph
+            ticks (list): y axis ticks (from __get_chart_data__)
 
         Returns:
-            float: column value
+            tuple: value of each px, and y position of zero (None if unknown)
         """
 
-        # Calculate column value (with 20 decimals)
-        value = (column_height * max_value / graph_height)
-        value = value * 100
-        value = round(value, 2)
-        value = value / 100
+        points = [(tick["y"], tick["value"]) for tick in ticks
+                  if tick["y"] is not None and tick["value"] is not None]
+
+        # Least squares fit: value = slope * y + intercept
+        if len(set(y for y, _ in points)) >= 2:
+            y_mean = sum(y for y, _ in points) / len(points)
+            value_mean = sum(value for _, value in points) / len(points)
+            covariance = sum((y - y_mean) * (value - value_mean) for y, value in points)
+            variance = sum((y - y_mean) ** 2 for y, _ in points)
+            slope = covariance / variance
+            intercept = value_mean - slope * y_mean
+            if slope:
+                return abs(slope), -intercept / slope
+
+        # Only max value: graph height and max value from last tick
+        last_tick = ticks[-1] if ticks else {}
+        if last_tick.get("height") and last_tick.get("value") is not None:
+            return last_tick["value"] / last_tick["height"], None
+
+        raise ValueError("graph scale not found")
 
-        return value
+    def __get_bars_values__(self, bars: list, scale: tuple) -> list:
+        """ Convert bars heights to values (negative below zero line)
 
-    def __get_columns_data__(self, selector_columns_wrapper: str, selector_column: str,
-                             graph_height: int, max_value: float) -> list:
+        Args:
+            bars (list): bars (from __get_chart_data__)
+            scale (tuple): value of each px and y of zero (from __get_chart_scale__)
+
+        Returns:
+            list: bars values (None for empty bars)
+        """
+
+        value_px, zero_y = scale
+
+        return [
+            None if not bar or bar["height"] is None else round(
+                (-1 if zero_y is not None and bar["y"] is not None
+                 and bar["y"] + bar["height"] / 2 > zero_y else 1)
+                * abs(bar["height"]) * value_px * 100, 2) / 100
+            for bar in bars
+        ]
+
+    def __get_columns_data__(self, bars: list, values: list) -> list:
         """ Get regular columns data from graph
 
         Args:
-            selector_columns_wrapper (str): columns weapper
-            selector_columns (str): each column
-            graph_height (int): height of graph in px
-            max_value (float): max value of graph
+            bars (list): bars (from __get_chart_data__)
+            values (list): bars values (from __get_bars_values__)
 
         Returns:
             dict: columns data
@@ -68,30 +222,17 @@ class ScrapingDilutionTracker (WebScraping):
             ]
         """
 
-        # Loop each column
-        columns_num = len(self.get_elems(selector_columns_wrapper))
         columns_data = []
-        for column_index in range(columns_num):
-
-            selector_current_column = f'{selector_columns_wrapper}:nth-child({column_index+1}) {selector_column}'
+        for column_index, (bar, column_value) in enumerate(zip(bars, values)):
 
             # Skip empty columns
-            column = self.get_elems(selector_current_column)
-            if not column:
+            if not bar or column_value is None:
                 continue
 
-            # Get data from current column
-            column_name = self.get_attrib(selector_current_column, "name")
-            column_height = float(self.get_attrib(
-                selector_current_column, "height"))
-
-            column_value = self.__get_column_value__(
-                column_height, graph_height, max_value)
-
             # Format date and detect when columns ends
             last_column = False
             try:
-                date = dt.strptime(column_name, "%m/%d/%Y")
+                date = dt.strptime(bar["name"], "%m/%d/%Y")
             except:
                 date = dt.now()
                 last_column = True
@@ -122,6 +263,7 @@ class ScrapingDilutionTracker (WebScraping):
     def __get_table_data__(self, selector_rows: str, column: dict,
                            start_row: int = 1, end_row: int = -1) -> list:
         """ get data from table structure
+            (all cells are read in the page with a single script call)
 
         Args:
             selector_rows (str): selector of each row of table
@@ -133,39 +275,70 @@ class ScrapingDilutionTracker (WebScraping):
             list: table data with dynamic structure (based on column dict)
         """
 
-        data = []
-
-        rows_num = len(self.get_elems(selector_rows))
-        for index in range(rows_num):
-
-            # End loop if end row is reached
-            if index + start_row == end_row:
-                break
+        # Cells to read in each row: [name, selector, is_link]
+        cells = []
+        for colum_name, column_data in column.items():
+            extra = column_data.get("extra", {})
+            cells.append([
+                colum_name,
+                column_data["selector"],
+                extra.get("is_link", False)
+            ])
+
+        # Read raw texts and links of all rows in one round trip
+        rows_json = self.driver.execute_script("""
+            const [selectorRows, cells, startRow, endRow] = arguments
+            const rowsNum = document.querySelectorAll(selectorRows).length
+            const rows = []
+            for (let index = 0; index < rowsNum; index++) {
+
+                // End loop if end row is reached
+                if (index + startRow == endRow) break
+
+                const selectorRow = `${selectorRows}:nth-child(${index + startRow})`
+                const row = {}
+                for (const [name, selector, isLink] of cells) {
+                    const elem = document.querySelector(`${selectorRow} ${selector}`)
+                    if (!elem) {
+                        row[name] = null
+                    } else if (isLink) {
+                        row[name] = elem.href || elem.getAttribute("href")
+                    } else {
+                        row[name] = elem.innerText
+                    }
+                }
+                rows.push(row)
+            }
+            return JSON.stringify(rows)
+        """, selector_rows, cells, start_row, end_row)
+        rows = json.loads(rows_json)
 
-            selector_row = f'{selector_rows}:nth-child({index + start_row})'
+        # Format values in python
+        data = []
+        replace_chats = [
+            "\\",
+            "'",
+            '"'
+        ]
+        for row in rows:
 
             data_row = {}
             for colum_name, column_data in column.items():
 
-                selector_column = f'{selector_row} {column_data["selector"]}'
                 data_type_column = column_data["data_type"]
+                value = row[colum_name]
 
-                # Extract links
+                # Links are saved as they are
                 extra = column_data.get("extra", {})
                 if extra.get("is_link", False):
-                    value = self.get_attrib(selector_column, "href")
                     data_row[colum_name] = value
                     continue
 
-                # Extract texts
-                replace_chats = [
-                    "\\",
-                    "'",
-                    '"'
-                ]
-                value = self.get_text(selector_column)
+                # Clean texts
+                value = value or ""
                 for chat in replace_chats:
                     value = value.replace(chat, "")
+                value = value.strip()
 
                 # Skip empty values
                 if not value:
@@ -220,7 +393,7 @@ class ScrapingDilutionTracker (WebScraping):
 
         # Load home page
         self.set_page(self.pages["home"])
-        self.refresh_selenium()
+        self.wait_ready(selectors["nav_items"])
 
         # Validte if exists "go to app" button
         go_to_app_found = False
@@ -246,10 +419,21 @@ class ScrapingDilutionTracker (WebScraping):
         modal_elem = self.get_elems(selectors["close_modal"])
         if modal_elem:
             self.click_js(selectors["close_modal"])
-            self.refresh_selenium()
+            self.wait_ready(network_idle=False, time_out=5)
 
         return True
 
+    def recycle_browser(self) -> bool:
+        """ Restart chrome (free leaked memory) and restore the logged
+            session from the chrome data folder
+
+        Returns:
+            bool: True if login success
+        """
+
+        self.restart_browser()
+        return self.login()
+
     def load_company(self, company: str):
         """ Load company page
 
@@ -257,17 +441,200 @@ class ScrapingDilutionTracker (WebScraping):
             company (str): company ticker
         """
 
+        selector_loaded = 'h1, #filingNotInCoverageIcon'
+
         url = f'{self.pages["home"]}/app/search/{company}'
         self.set_page(url)
-        self.refresh_selenium()
+        self.wait_ready(selector_loaded)
 
         # Delete extra icons
         self.__delete_icons__()
-        self.refresh_selenium()
 
-    def get_premarket_data(self) -> dict:
+    def __get_premarket_payload__(self, selectors: dict) -> dict:
+        """ Get raw premarket texts, one webdriver command per field
+            (previous extraction, used when snapshot mode is disabled)
+
+        Args:
+            selectors (dict): premarket selectors
+
+        Returns:
+            dict: raw premarket texts (same structure as __get_premarket_snapshot__)
+        """
+
+        payload = {
+            "not_found": None,
+            "name": None,
+            "header_texts": [],
+            "header_counters": [],
+            "description": None,
+            "adjectives": [],
+            "our_take": [],
+            "update_info": None,
+        }
+
+        # Validate not found data
+        payload["not_found"] = self.get_text(selectors["not_found"])
+        if payload["not_found"] == "We haven't indexed this ticker yet":
+            return payload
+
+        # Get company name
+        payload["name"] = self.get_text(selectors["name"])
+
+        # Get header texts and counters
+        for wrapper_name, payload_name in [("wrapper_texts", "header_texts"),
+                                           ("wrapper_counters", "header_counters")]:
+            headers_num = len(self.get_elems(selectors["header"][wrapper_name]))
+            for header_index in range(headers_num):
+
+                # Get key and info
+                selector_header = f'{selectors["header"][wrapper_name]}:nth-child({header_index+1})'
+                selector_texts = f'{selector_header} {selectors["header"]["info"]}'
+                texts = self.get_elems(selector_texts)
+                payload[payload_name].append([texts[0].text, texts[1].text])
+
+        # Company description
+        try:
+            self.click(selectors["description"]["show_more_btn"])
+        except:
+            pass
+        else:
+            self.wait_ready(network_idle=False, time_out=5)
+        payload["description"] = self.get_text(
+            selectors["description"]["info"])
+
+        # Adjectives
+        adjectives_num = len(self.get_elems(
+            selectors["adjectives"]["wrappers"]))
+        for adjective_index in range(adjectives_num):
+
+            # Get each adjective and category
+            selector_adjective = f'{selectors["adjectives"]["wrappers"]}:nth-child({adjective_index+1})'
+            selector_name = f'{selector_adjective} {selectors["adjectives"]["name"]}'
+            selector_info = f'{selector_adjective} {selectors["adjectives"]["info"]}'
+            payload["adjectives"].append([
+                self.get_text(selector_name),
+                self.get_text(selector_info),
+            ])
+
+        # Our take
+        our_take_num = len(self.get_elems(selectors["our_take"]["wrappers"]))
+        for our_take_index in range(our_take_num):
+
+            # Get each line of our take
+            selector_our_take = f'{selectors["our_take"]["wrappers"]}:nth-child({our_take_index+2})'
+            selector_datetime = f'{selector_our_take} {selectors["our_take"]["datetime"]}'
+            selector_info = f'{selector_our_take} {selectors["our_take"]["info"]}'
+            payload["our_take"].append([
+                self.get_text(selector_datetime),
+                self.get_text(selector_info),
+            ])
+
+        # Update info
+        payload["update_info"] = self.get_text(selectors["update_info"])
+
+        return payload
+
+    def __get_premarket_snapshot__(self, selectors: dict) -> dict:
+        """ Get raw premarket texts with a single injected script
+
+        Args:
+            selectors (dict): premarket selectors
+
+        Returns:
+            dict: raw premarket texts
+
+            Structure:
+            {
+                not_found: str,
+                name: str,
+                header_texts: [[str (key), str (info)], ...],
+                header_counters: [[str (key), str (info)], ...],
+                description: str,
+                adjectives: [[str (name), str (info)], ...],
+                our_take: [[str (datetime), str (info)], ...],
+                update_info: str,
+            }
+        """
+
+        payload_json = self.driver.execute_async_script("""
+            const [selectors, showMoreWait, done] = arguments
+
+            const getText = (selector, parent = document) => {
+                const elem = parent.querySelector(selector)
+                return elem ? elem.innerText.trim() : null
+            }
+
+            const getPairs = (selectorWrappers, selectorKey, selectorInfo) => {
+                const pairs = []
+                document.querySelectorAll(selectorWrappers).forEach(wrapper => {
+                    pairs.push([
+                        getText(`:scope ${selectorKey}`, wrapper) ?? "",
+                        getText(`:scope ${selectorInfo}`, wrapper) ?? "",
+                    ])
+                })
+                return pairs
+            }
+
+            const getHeaderPairs = (selectorWrappers) => {
+                const pairs = []
+                document.querySelectorAll(selectorWrappers).forEach(wrapper => {
+                    const texts = wrapper.querySelectorAll(`:scope ${selectors.header.info}`)
+                    if (texts.length < 2) return
+                    pairs.push([texts[0].innerText.trim(), texts[1].innerText.trim()])
+                })
+                return pairs
+            }
+
+            const collect = () => {
+                const payload = {
+                    not_found: getText(selectors.not_found),
+                    name: null,
+                    header_texts: [],
+                    header_counters: [],
+                    description: null,
+                    adjectives: [],
+                    our_take: [],
+                    update_info: null,
+                }
+                if (payload.not_found != "We haven't indexed this ticker yet") {
+                    payload.name = getText(selectors.name)
+                    payload.header_texts = getHeaderPairs(selectors.header.wrapper_texts)
+                    payload.header_counters = getHeaderPairs(selectors.header.wrapper_counters)
+                    payload.description = getText(selectors.description.info)
+                    payload.adjectives = getPairs(
+                        selectors.adjectives.wrappers,
+                        selectors.adjectives.name,
+                        selectors.adjectives.info,
+                    )
+                    payload.our_take = getPairs(
+                        selectors.our_take.wrappers,
+                        selectors.our_take.datetime,
+                        selectors.our_take.info,
+                    )
+                    payload.update_info = getText(selectors.update_info)
+                }
+                done(JSON.stringify(payload))
+            }
+
+            // Expand company description before reading it
+            const showMoreBtn = document.querySelector(selectors.description.show_more_btn)
+            if (showMoreBtn) {
+                showMoreBtn.click()
+                setTimeout(collect, showMoreWait)
+            } else {
+                collect()
+            }
+        """, selectors, 500)
+
+        return json.loads(payload_json)
+
+    def get_premarket_data(self, snapshot: bool = True) -> dict:
         """ Get premarket data from dilution tracker
 
+        Args:
+            snapshot (bool, optional): read all the fields with a single
+                injected script. Defaults to True.
+
         Returns:
             dict: premarket data
 
@@ -290,7 +657,8 @@ class ScrapingDilutionTracker (WebScraping):
                 historical: str
                 cash_need: str,
                 out_take: str,
-                update_info: str,                    
+                update_info: str,
+                header_hash: str,
             }
         """
 
@@ -339,10 +707,17 @@ class ScrapingDilutionTracker (WebScraping):
             "cash_need": None,
             "out_take": None,
             "update_info": None,
+            "header_hash": None,
         }
 
+        # Get raw texts from page
+        if snapshot:
+            payload = self.__get_premarket_snapshot__(selectors)
+        else:
+            payload = self.__get_premarket_payload__(selectors)
+
         # Validate not found data and save in dilution_data
-        not_found = self.get_text(selectors["not_found"])
+        not_found = payload["not_found"]
         if not_found:
             data["dilution_data"] = not_found
             if not_found == "We haven't indexed this ticker yet": 
@@ -350,20 +725,13 @@ class ScrapingDilutionTracker (WebScraping):
                 return data
 
         # Get company name
-        data["name"] = self.get_text(selectors["name"])
+        data["name"] = payload["name"]
 
         # Get header texts
-        headers_text_num = len(self.get_elems(
-            selectors["header"]["wrapper_texts"]))
-        for header_index in range(headers_text_num):
+        for key, info in payload["header_texts"]:
 
-            # Get key and info
-            selector_header = f'{selectors["header"]["wrapper_texts"]}:nth-child({header_index+1})'
-            selector_texts = f'{selector_header} {selectors["header"]["info"]}'
-            texts = self.get_elems(selector_texts)
-
-            key = texts[0].text.lower()
-            info = texts[1].text.lower()
+            key = key.lower()
+            info = info.lower()
 
             if "sector" in key:
                 data["sector"] = info
@@ -371,16 +739,10 @@ class ScrapingDilutionTracker (WebScraping):
                 data["industry"] = info
 
         # Get headers counters
-        headers_counters_num = len(self.get_elems(selectors["header"]["wrapper_counters"]))
-        for header_index in range(headers_counters_num):
-
-            # Get keys and info
-            selector_header = f'{selectors["header"]["wrapper_counters"]}:nth-child({header_index+1})'
-            selector_counters = f'{selector_header} {selectors["header"]["info"]}'
-            counters = self.get_elems(selector_counters)
+        for key, info in payload["header_counters"]:
 
-            key = counters[0].text.lower()
-            info = counters[1].text.lower()
+            key = key.lower()
+            info = info.lower()
 
             if "mkt cap" in key:
                 data["mkt_cap"] = info.split("m")[0].split("t")[0]
@@ -394,26 +756,13 @@ class ScrapingDilutionTracker (WebScraping):
                 data["si"] = info.replace("%", "")
 
         # Company description
-        try:
-            self.click(selectors["description"]["show_more_btn"])
-        except:
-            pass
-        else:
-            self.refresh_selenium()
-        data["description_company"] = self.get_text(
-            selectors["description"]["info"])
+        data["description_company"] = payload["description"]
 
         # Adjectives
-        adjectives_num = len(self.get_elems(
-            selectors["adjectives"]["wrappers"]))
-        for adjective_index in range(adjectives_num):
+        for name, info in payload["adjectives"]:
 
-            # Get each adjective and category
-            selector_adjective = f'{selectors["adjectives"]["wrappers"]}:nth-child({adjective_index+1})'
-            selector_name = f'{selector_adjective} {selectors["adjectives"]["name"]}'
-            selector_info = f'{selector_adjective} {selectors["adjectives"]["info"]}'
-            name = self.get_text(selector_name).lower()
-            info = self.get_text(selector_info).lower()
+            name = name.lower()
+            info = info.lower()
 
             if "overall risk" in name:
                 data["overall_risk"] = info
@@ -428,25 +777,22 @@ class ScrapingDilutionTracker (WebScraping):
 
         # Our take
         our_take_lines = ""
-        our_take_num = len(self.get_elems(selectors["our_take"]["wrappers"]))
-        for our_take_index in range(our_take_num):
-
-            # Get each line of our take
-            selector_our_take = f'{selectors["our_take"]["wrappers"]}:nth-child({our_take_index+2})'
-            selector_datetime = f'{selector_our_take} {selectors["our_take"]["datetime"]}'
-            selector_info = f'{selector_our_take} {selectors["our_take"]["info"]}'
-
-            datetime = self.get_text(selector_datetime).lower()
-            info = self.get_text(selector_info).lower()
+        for datetime, info in payload["our_take"]:
 
             # Save as text
-            line = f'{datetime}  {info}'
+            line = f'{datetime.lower()}  {info.lower()}'
             our_take_lines += f'{line}\n'
 
         data["out_take"] = our_take_lines.strip()
 
         # Update info
-        data["update_info"] = self.get_text(selectors["update_info"])
+        data["update_info"] = payload["update_info"]
+
+        # Hash of the stable header texts, to detect changes without scraping all
+        # sections (counters like mkt cap or si move with the price every day)
+        header_block = json.dumps([payload["header_texts"], payload["adjectives"],
+                                   payload["our_take"]])
+        data["header_hash"] = hashlib.sha1(header_block.encode("utf-8")).hexdigest()
 
         return data
 
@@ -478,9 +824,10 @@ class ScrapingDilutionTracker (WebScraping):
         selectors = {
             "columns_wrapper": '#results-os-chart .recharts-bar-rectangles .recharts-bar-rectangle',
             "column": 'path',
-            "height": '.yAxis .recharts-cartesian-axis-tick:last-child > text',
-            "max_value": '.yAxis .recharts-cartesian-axis-tick:last-child > text tspan',
-            "extra_columns": '#results-os-chart path[name="Fully Diluted"]'
+            "axis": '.yAxis',
+            "extra_columns": {
+                "fully_diluted": '#results-os-chart path[name="Fully Diluted"]',
+            },
         }
 
         columns_colors = {
@@ -498,32 +845,21 @@ class ScrapingDilutionTracker (WebScraping):
             data[column_name] = None
 
         # Get graph info
-        graph_height = int(self.get_attrib(selectors["height"], "height"))
-        max_value = float(self.get_text(selectors["max_value"]))
+        chart_data = self.__get_chart_data__(selectors)
+        scale = self.__get_chart_scale__(chart_data["ticks"])
 
         # Data from regylar columns
-        data["columns_data"] = self.__get_columns_data__(
-            selectors["columns_wrapper"],
-            selectors["column"],
-            graph_height,
-            max_value,
-        )
+        values = self.__get_bars_values__(chart_data["bars"], scale)
+        data["columns_data"] = self.__get_columns_data__(chart_data["bars"], values)
 
         # Data frome extra columns
-        extra_columns = self.get_elems(selectors["extra_columns"])
-        for column in extra_columns:
-
-            # Get color
-            column_color = column.get_attribute("fill")
-            column_height = float(column.get_attribute("height"))
-
-            # Get column value
-            column_value = self.__get_column_value__(
-                column_height, graph_height, max_value)
+        extra_columns = chart_data["extras"]["fully_diluted"]
+        values = self.__get_bars_values__(extra_columns, scale)
+        for column, column_value in zip(extra_columns, values):
 
             # Identify name with color
-            column_name = columns_colors.get(column_color, None)
-            if not column_name:
+            column_name = columns_colors.get(column["fill"], None)
+            if not column_name or column_value is None:
                 continue
 
             # Save column data
@@ -562,10 +898,7 @@ class ScrapingDilutionTracker (WebScraping):
         selectors["graph"] = '.results-cash-bar-chart'  # graph wrapper
         selectors["columns_wrapper"] = f'{selectors["graph"]} .yAxis + g .recharts-layer'
         selectors["column"] = 'path'
-        selectors["values_wrapper"] = f'{selectors["graph"]} .yAxis .recharts-cartesian-axis-tick'
-        selectors["height"] = f'{selectors["values_wrapper"]}:last-child > text'
-        selectors["max_value"] = f'{selectors["values_wrapper"]}:last-child > text tspan'
-        selectors["min_value"] = selectors["max_value"].replace("last-child", "first-child")
+        selectors["axis"] = f'{selectors["graph"]} .yAxis'
         selectors["extra_columns"] = {
             "prorated_operating": f'{selectors["graph"]} [name="OpCF"]:not([fill="none"])',
             "capital_rise": f'{selectors["graph"]} [name="Cap Raise"]:not([fill="none"])',
@@ -577,34 +910,17 @@ class ScrapingDilutionTracker (WebScraping):
         data = {}
 
         # Get graph info
-        graph_height = int(self.get_attrib(selectors["height"], "height"))
-        max_value = float(self.get_text(selectors["max_value"]))
-        min_value = float(self.get_text(selectors["min_value"]))
-        range_value = max_value + abs(min_value)
+        chart_data = self.__get_chart_data__(selectors)
+        scale = self.__get_chart_scale__(chart_data["ticks"])
 
         # Data from regylar columns
-        data["columns_data"] = self.__get_columns_data__(
-            selectors["columns_wrapper"],
-            selectors["column"],
-            graph_height,
-            range_value,
-        )
+        values = self.__get_bars_values__(chart_data["bars"], scale)
+        data["columns_data"] = self.__get_columns_data__(chart_data["bars"], values)
 
-        # Data from extra columns
-        for column_name, selector in selectors["extra_columns"].items():
-
-            # Get and validate column height
-            column_height_str = self.get_attrib(selector, "height")
-            if column_height_str:
-                # Calculate value
-                column_height = float(column_height_str)
-                column_value = self.__get_column_value__(
-                    column_height, graph_height, range_value)
-            else:
-                # Same value
-                column_value = None
-
-            data[column_name] = column_value
+        # Data from extra columns (first bar of each one)
+        for column_name, extra_columns in chart_data["extras"].items():
+            values = self.__get_bars_values__(extra_columns[:1], scale)
+            data[column_name] = values[0] if values else None
 
         # Get data from description
         data["cash_description"] = self.get_text(selectors["description"])
@@ -664,66 +980,44 @@ class ScrapingDilutionTracker (WebScraping):
 
         }
 
-        data = []
+        # Walk all the details tables in one round trip
+        data = self.driver.execute_script("""
+            const [selectors] = arguments
+            const getText = (elem, selector) => {
+                const found = elem ? elem.querySelector(selector) : null
+                return found ? found.innerText.trim() : null
+            }
 
-        # Identify position of first extra table
-        first_extra_index = 0
-        content_sections_num = len(
-            self.get_elems(selectors["content_section"]))
-        for section_index in range(content_sections_num):
-            selector_section = f'{selectors["content_section"]}:nth-child({section_index+1}){selectors["extras_wrapper"]}'
-            section = self.get_elems(selector_section)
-            if section:
-                first_extra_index = section_index
-                break
+            // Extras start in the first content section with extras wrapper
+            const sections = [...document.querySelectorAll(selectors.content_section)]
+            const extras = sections.filter(section => section.matches(selectors.extras_wrapper))
+
+            const data = []
+            for (const extra of extras) {
+                const title = getText(extra, selectors.title)
+
+                // Loop data tables
+                const tables = extra.querySelectorAll(selectors.table.wrapper)
+                tables.forEach((table, tableIndex) => {
+                    const tableTitle = getText(table, selectors.table.title)
+                    const tableStatus = getText(table, selectors.table.status)
+
+                    // Loop table rows
+                    for (const row of table.querySelectorAll(selectors.table.data.wrapper)) {
+                        data.push({
+                            origin: title,
+                            status: tableStatus,
+                            name: tableTitle,
+                            title: getText(row, selectors.table.data.item),
+                            value: getText(row, selectors.table.data.value),
+                            position: tableIndex + 1,
+                        })
+                    }
+                })
+            }
 
-        # Loop each extra table
-        extras_num = len(self.get_elems(selectors["extras_wrapper"]))
-        for extra_index in range(extras_num):
-
-            # Get extra title
-            selector_extra = f'{selectors["extras_wrapper"]}:nth-child({extra_index+first_extra_index+1})'
-            selector_title = f'{selector_extra} {selectors["title"]}'
-            title = self.get_text(selector_title)
-
-            # Loop data tables
-            selectors_table = selectors["table"]
-            selector_tables = f'{selector_extra} {selectors_table["wrapper"]}'
-            tables_num = len(self.get_elems(selector_tables))
-            for table_index in range(tables_num):
-
-                selector_table = f'{selector_tables}:nth-child({table_index+1})'
-
-                # Get table title
-                selector_table_title = f'{selector_table} {selectors_table["title"]}'
-                table_title = self.get_text(selector_table_title)
-
-                # Get table status
-                selector_table_status = f'{selector_table} {selectors_table["status"]}'
-                table_status = self.get_text(selector_table_status)
-
-                # Get table info
-                selector_rows = f'{selector_table} {selectors_table["data"]["wrapper"]}'
-                rows_num = len(self.get_elems(selector_rows))
-                for row_index in range(rows_num):
-
-                    selector_row = f'{selector_rows}:nth-child({row_index+1})'
-
-                    # Get row data
-                    selector_item = f'{selector_row} {selectors_table["data"]["item"]}'
-                    selector_value = f'{selector_row} {selectors_table["data"]["value"]}'
-                    item = self.get_text(selector_item)
-                    value = self.get_text(selector_value)
-
-                    # Save data
-                    data.append({
-                        "origin": title,
-                        "status": table_status,
-                        "name": table_title,
-                        "title": item,
-                        "value": value,
-                        "position": table_index + 1,
-                    })
+            return data
+        """, selectors)
 
         return data
 
@@ -843,7 +1137,7 @@ class ScrapingDilutionTracker (WebScraping):
 
         # Move to tab
         self.click(selector_btn)
-        self.refresh_selenium()
+        self.wait_ready(selector_rows)
 
         # Get table data
         table_data = self.__get_table_data__(
@@ -926,7 +1220,7 @@ class ScrapingDilutionTracker (WebScraping):
 
         # Move to tab
         self.click(selector_btn)
-        self.refresh_selenium()
+        self.wait_ready(selector_rows)
 
         table_data = self.__get_table_data__(
             selector_rows,
@@ -935,9 +1229,112 @@ class ScrapingDilutionTracker (WebScraping):
 
         return table_data
 
-    def get_filings_data(self) -> list:
-        """ Get filings from the last 10 days, data from filings tab
-        in Chronological table
+    def __get_filing_link__(self, selector_link: str) -> str:
+        """ Get the target url of a filing row without opening it.
+            Read the link from the anchor / data attributes of the row, or
+            capture the window.open (or history) call of the click handler,
+            with the page navigation blocked. Only when both fail, open the
+            filing in a new tab and read its url.
+
+        Args:
+            selector_link (str): selector of the clickable filing element
+
+        Returns:
+            str: filing url (None if the filing does not open any page)
+        """
+
+        link = self.driver.execute_async_script("""
+            const [selector, waitMs, done] = arguments
+            const elem = document.querySelector(selector)
+            if (!elem) return done(null)
+
+            // Link in anchor or data attributes
+            const anchor = elem.closest("a[href]") || elem.querySelector("a[href]")
+            if (anchor && !anchor.getAttribute("href").startsWith("#")) {
+                return done(anchor.href)
+            }
+            for (const attrib of ["data-href", "data-url", "data-link"]) {
+                const attribElem = elem.closest(`[${attrib}]`) || elem.querySelector(`[${attrib}]`)
+                if (attribElem) {
+                    return done(new URL(attribElem.getAttribute(attrib), location.href).href)
+                }
+            }
+
+            // Capture window.open calls from the click handler
+            const opened = []
+            const saveUrl = url => opened.push(new URL(String(url), location.href).href)
+            const fakeLocation = {assign: saveUrl, replace: saveUrl}
+            Object.defineProperty(fakeLocation, "href", {set: saveUrl})
+            const fakeWindow = {closed: false, focus() {}, close() {}, opener: null}
+            Object.defineProperty(fakeWindow, "location", {
+                get: () => fakeLocation,
+                set: saveUrl,
+            })
+            const windowOpen = window.open
+            window.open = (url) => {
+                if (url) saveUrl(url)
+                return fakeWindow
+            }
+
+            // Keep the current page: capture the app navigation and
+            // prevent the default action of the click (after the handlers)
+            const pushState = history.pushState
+            const replaceState = history.replaceState
+            history.pushState = (state, title, url) => url && saveUrl(url)
+            history.replaceState = (state, title, url) => url && saveUrl(url)
+            const preventNavigation = event => event.preventDefault()
+            window.addEventListener("click", preventNavigation)
+
+            // Wait for async handlers and restore window and history
+            const start = Date.now()
+            const check = () => {
+                if (opened.length || Date.now() - start > waitMs) {
+                    window.open = windowOpen
+                    history.pushState = pushState
+                    history.replaceState = replaceState
+                    window.removeEventListener("click", preventNavigation)
+                    done(opened.length ? opened[0] : null)
+                } else {
+                    setTimeout(check, 50)
+                }
+            }
+            elem.dispatchEvent(new MouseEvent("click", {
+                bubbles: true,
+                cancelable: true,
+                view: window,
+            }))
+            check()
+        """, selector_link, 1000)
+
+        if link:
+            return link
+
+        # Fallback: open link in a new tab
+        main_tab = self.driver.current_window_handle
+        self.click_js(selector_link)
+        sleep(5)
+
+        # Close all new tabs (also the ones opened late by the first click)
+        link = None
+        new_tabs = [tab for tab in self.driver.window_handles if tab != main_tab]
+        for tab in new_tabs:
+            self.driver.switch_to.window(tab)
+            link = self.driver.current_url
+            self.close_tab()
+        self.driver.switch_to.window(main_tab)
+
+        return link
+
+    def get_filings_data(self, last_date: date = None, last_links: list = []) -> list:
+        """ Get new filings, data from filings tab in Chronological table.
+        Stop at the last filing already saved, or at the last 10 days
+        when there are not filings saved
+
+        Args:
+            last_date (date, optional): date of the last filing saved.
+                Defaults to None (use last 10 days).
+            last_links (list, optional): links of the filings saved with
+                last_date. Defaults to [].
 
         Returns:
             list: filings data
@@ -964,29 +1361,38 @@ class ScrapingDilutionTracker (WebScraping):
         selector_date = '.secFilingFiledAt'
         selector_link = '> div'
 
+        # Get 10 days ago fromn today (when there are not filings saved)
+        if not last_date:
+            days_ago = 10
+            today = dt.now()
+            last_date = (today - timedelta(days=days_ago)).date()
+
         # Move to tab
+        selector_row = f'{selector_table} {selector_rows}'
         self.click(selector_btn)
-        self.refresh_selenium()
+        self.wait_ready(selector_row)
 
-        # Load add results
+        # Load add results, until the last date is visible
         for _ in range(4):
 
             display_all_btn = self.get_elems(selector_display_all)
             if not display_all_btn:
                 break
 
-            self.click_js(selector_display_all)
+            # Date of the last row with date (not the fetch more row)
+            oldest_date = self.driver.execute_script("""
+                const dates = document.querySelectorAll(arguments[0])
+                return dates.length ? dates[dates.length - 1].textContent.trim() : null
+            """, f'{selector_row} {selector_date}')
+            if oldest_date and dt.strptime(oldest_date, "%m/%d/%y").date() <= last_date:
+                break
 
-            self.refresh_selenium()
+            self.click_js(selector_display_all)
 
-        # Get 10 days ago fromn today
-        days_ago = 10
-        today = dt.now()
-        last_date = today - timedelta(days=days_ago)
+            self.wait_ready()
 
-        # Loop rows
-        data = []
-        selector_row = f'{selector_table} {selector_rows}'
+        # Loop rows until the last date
+        rows = []
         rows_num = len(self.get_elems(selector_row))
         for index in range(rows_num):
 
@@ -999,22 +1405,38 @@ class ScrapingDilutionTracker (WebScraping):
             headline = self.get_text(selector_current_headline)
             date = self.get_text(selector_current_date)
 
+            # Skip rows without date (fetch more row)
+            if not date:
+                continue
+
             # Format date like 11/16/23
             date = dt.strptime(date, "%m/%d/%y")
 
-            # Get link openning in a new tab
-            selector_current_link = f'{selector_row}:nth-child({index+1}) {selector_link}'
-            self.click_js(selector_current_link)
-            sleep(5)
-            self.switch_to_tab(1)
-            link = self.driver.current_url
-            self.close_tab()
-            self.switch_to_tab(0)
-
             # End when found the last date
-            if date < last_date:
+            if date.date() < last_date:
                 break
 
+            rows.append((index, name, headline, date))
+
+        # Skip the filings of the last date without resolving their links
+        # when all of them are saved (no new filings in that date)
+        last_date_rows = [row for row in rows if row[3].date() == last_date]
+        last_date_saved = len(last_date_rows) <= len(last_links)
+
+        data = []
+        for index, name, headline, date in rows:
+
+            if date.date() == last_date and last_date_saved:
+                continue
+
+            # Get link without leaving the page
+            selector_current_link = f'{selector_row}:nth-child({index+1}) {selector_link}'
+            link = self.__get_filing_link__(selector_current_link)
+
+            # Skip filings already saved
+            if date.date() == last_date and link in last_links:
+                continue
+
             data.append({
                 "name": name,
                 "headline": headline,
@@ -1024,25 +1446,25 @@ class ScrapingDilutionTracker (WebScraping):
 
         return data
 
-    def get_noncompliant_data(self, tricker :str) -> list:
-        """ Get data from noncompliantcompanylist page
-        
-        Args:
-            tricker (str): company tricker (identifier)
+    def __load_noncompliant_index__(self) -> dict:
+        """ Load noncompliantcompanylist page and index all rows by tricker
 
         Returns:
-            list: no complaint data
+            dict: no complaint data by tricker
 
             Structure:
-            [
-                {
-                    "company": str,
-                    "deficiency": str,
-                    "market": str,
-                    "notification_date": datetime,
-                },
+            {
+                "str (tricker)": [
+                    {
+                        "company": str,
+                        "deficiency": str,
+                        "market": str,
+                        "notification_date": datetime,
+                    },
+                    ...
+                ],
                 ...
-            ]
+            }
         """
 
         selectors = {
@@ -1056,51 +1478,81 @@ class ScrapingDilutionTracker (WebScraping):
         }
 
         # Load page and open registers
-        self.set_page(
-            "https://listingcenter.nasdaq.com/noncompliantcompanylist.aspx")
+        self.set_page(self.pages["noncompliant"])
         self.click_js(selectors["dispay_btn"])
-        sleep(5)
-        self.refresh_selenium()
+        self.wait_ready(selectors["rows"], time_out=20)
+
+        # Get all rows in one round trip
+        columns = {}
+        for column_name in ["company", "tricker", "deficiency", "market", "notification_date"]:
+            columns[column_name] = {
+                "selector": selectors[column_name],
+                "data_type": str,
+            }
+        rows = self.__get_table_data__(selectors["rows"], columns)
 
         # Loop each row
-        rows_num = len(self.get_elems(selectors["rows"]))
         current_company = ""
-        data = []
-        for index in range(rows_num):
-
-            selector_row = f'{selectors["rows"]}:nth-child({index+1})'
-            selector_company = f'{selector_row} {selectors["company"]}'
+        index_data = {}
+        for row in rows:
 
             # Detect new company
-            company = self.get_text(selector_company)
-            if company:
-                current_company = company
+            if row["company"] != "NULL":
+                current_company = row["company"]
                 continue
 
-            # Validate company tricker
-            selector_tricker = f'{selector_row} {selectors["tricker"]}'
-            current_tricker = self.get_text(selector_tricker).lower().strip()
-            if tricker not in current_tricker:
+            # Get company tricker
+            if row["tricker"] == "NULL":
                 continue
-            
-            # Extract row data
-            selector_deficiency = f'{selector_row} {selectors["deficiency"]}'
-            selector_market = f'{selector_row} {selectors["market"]}'
-            selector_notification_date = f'{selector_row} {selectors["notification_date"]}'
-
-            deficiency = self.get_text(selector_deficiency)
-            market = self.get_text(selector_market)
-            notification_date = self.get_text(selector_notification_date)
+            current_tricker = row["tricker"].lower().strip()
 
             # Format date
-            notification_date = dt.strptime(notification_date, "%m/%d/%Y")
+            notification_date = dt.strptime(row["notification_date"], "%m/%d/%Y")
 
             # Save data
-            data.append({
+            index_data.setdefault(current_tricker, []).append({
                 "company": current_company,
-                "deficiency": deficiency,
-                "market": market,
+                "deficiency": row["deficiency"],
+                "market": row["market"],
                 "notification_date": notification_date,
             })
 
-        return data
+        return index_data
+
+    def get_noncompliant_data(self, tricker: str) -> list:
+        """ Get data from noncompliantcompanylist page
+            (the page is loaded only once per run or per ttl, by the
+            first worker that needs it)
+
+        Args:
+            tricker (str): company tricker (identifier)
+
+        Returns:
+            list: no complaint data
+
+            Structure:
+            [
+                {
+                    "company": str,
+                    "deficiency": str,
+                    "market": str,
+                    "notification_date": datetime,
+                },
+                ...
+            ]
+        """
+
+        # Reload index when is missing or expired (other workers wait for it)
+        with ScrapingDilutionTracker.noncompliant_lock:
+            loaded_at = ScrapingDilutionTracker.noncompliant_loaded_at
+            index_expired = (
+                self.noncompliant_ttl > 0
+                and loaded_at is not None
+                and time() - loaded_at > self.noncompliant_ttl
+            )
+            if ScrapingDilutionTracker.noncompliant_index is None or index_expired:
+                ScrapingDilutionTracker.noncompliant_index = self.__load_noncompliant_index__()
+                ScrapingDilutionTracker.noncompliant_loaded_at = time()
+            noncompliant_index = ScrapingDilutionTracker.noncompliant_index
+
+        return noncompliant_index.get(tricker.lower().strip(), [])
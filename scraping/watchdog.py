@@ -0,0 +1,69 @@
+class MemoryWatchdog ():
+
+    def __init__(self, max_tickers: int = 0, max_rss_mb: float = 0,
+                 max_heap_mb: float = 0):
+        """ Decide when to restart chrome: after some tickers or when its
+            memory is too high (renderers leak memory in long runs)
+
+        Args:
+            max_tickers (int, optional): tickers scraped with the same chrome
+                instance. Defaults to 0 (no limit).
+            max_rss_mb (float, optional): max memory of all chrome processes
+                (requires psutil). Defaults to 0 (no limit).
+            max_heap_mb (float, optional): max js heap of the current tab.
+                Defaults to 0 (no limit).
+        """
+
+        self.max_tickers = max_tickers
+        self.max_rss_mb = max_rss_mb
+        self.max_heap_mb = max_heap_mb
+
+        self.tickers = 0
+        self.recycles = 0
+        self.last_memory = {}
+
+    def is_enabled(self) -> bool:
+        """ Validate if any limit is set
+
+        Returns:
+            bool: True if chrome can be recycled
+        """
+
+        return bool(self.max_tickers or self.max_rss_mb or self.max_heap_mb)
+
+    def check(self, scraper) -> str:
+        """ Count a scraped ticker and validate the limits
+
+        Args:
+            scraper (WebScraping): scraper instance
+
+        Returns:
+            str: reason to recycle chrome ("" to keep it)
+        """
+
+        self.tickers += 1
+
+        if self.max_tickers and self.tickers >= self.max_tickers:
+            return f"{self.tickers} tickers"
+
+        if not self.max_rss_mb and not self.max_heap_mb:
+            return ""
+
+        memory = scraper.get_memory()
+        self.last_memory = memory
+
+        rss_mb = memory["rss_mb"]
+        if self.max_rss_mb and rss_mb is not None and rss_mb >= self.max_rss_mb:
+            return f"{rss_mb} MB rss"
+
+        heap_mb = memory["heap_mb"]
+        if self.max_heap_mb and heap_mb >= self.max_heap_mb:
+            return f"{heap_mb} MB js heap"
+
+        return ""
+
+    def reset(self):
+        """ Restart counters after recycle chrome """
+
+        self.tickers = 0
+        self.recycles += 1
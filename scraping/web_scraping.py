@@ -1,12 +1,21 @@
 import os
+import json
 import time
 import zipfile
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import Select
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import Select, WebDriverWait
 from selenium.webdriver.chrome.service import Service
 
+# Optional: chrome processes memory (rss)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 current_file = os.path.basename(__file__)
 
 class WebScraping ():
@@ -22,7 +31,8 @@ class WebScraping ():
                  chrome_folder="", user_agent=False, 
                  download_folder="", extensions=[], incognito=False, experimentals=True,
                  start_killing=False, start_openning:bool=True, width:int=1280, height:int=720,
-                 mute:bool=True):
+                 mute:bool=True, network_logs:bool=False, profiler=None,
+                 blocked_urls:list=[]):
         """ Constructor of the class
 
         Args:
@@ -43,6 +53,9 @@ class WebScraping ():
             width (int, optional): Width of the window. Defaults to 1280.
             height (int, optional): Height of the window. Defaults to 720.
             mute (bool, optional): Mute the audio of the window. Defaults to True.
+            network_logs (bool, optional): Enable chrome performance logs (CDP network events). Defaults to False.
+            profiler (CommandProfiler, optional): Profiler of the webdriver commands. Defaults to None.
+            blocked_urls (list, optional): Url patterns (with * wildcards) to not load, like "*.png". Defaults to [].
         """
 
         self.basetime = 1
@@ -65,15 +78,22 @@ class WebScraping ():
         self.__width__ = width
         self.__height__ = height
         self.__mute__ = mute
+        self.__network_logs__ = network_logs
+        self.__profiler__ = profiler
+        self.__blocked_urls__ = blocked_urls
+        self.__time_out__ = time_out
         
         self.__web_page__ = None
 
+        # Network activity (from performance logs) and wait times by signal
+        self.network_inflight = set()
+        self.network_last_activity = time.time()
+        self.network_clock_offset = None
+        self.wait_stats = {}
+
         # Kill chrome from CMD in donwows
         if start_killing:
-            print("\nTry to kill chrome...")
-            command = 'taskkill /IM "chrome.exe" /F'
-            os.system(command)
-            print("Ok\n")
+            WebScraping.kill_chrome()
 
         # Create and instance of the web browser
         if self.__start_openning__:
@@ -86,6 +106,15 @@ class WebScraping ():
         if time_out > 0:
             self.driver.set_page_load_timeout(time_out)
 
+    @staticmethod
+    def kill_chrome():
+        """ Kill all chrome process from CMD in windows """
+
+        print("\nTry to kill chrome...")
+        command = 'taskkill /IM "chrome.exe" /F'
+        os.system(command)
+        print("Ok\n")
+
     def set_cookies (self, cookies:list):
         """ Get list of cookies, formatted, from 'cookies.json' file
 
@@ -120,54 +149,54 @@ class WebScraping ():
         os.environ['WDM_PRINT_FIRST_LINE'] = 'False'
 
         # Configure browser
-        if not WebScraping.options:
+        if not self.options:
             
-            WebScraping.options = webdriver.ChromeOptions()
-            WebScraping.options.add_argument('--no-sandbox')
-            WebScraping.options.add_argument('--start-maximized')
-            WebScraping.options.add_argument('--output=/dev/null')
-            WebScraping.options.add_argument('--log-level=3')
-            WebScraping.options.add_argument("--disable-notifications")
-            WebScraping.options.add_argument("--disable-infobars")
-            WebScraping.options.add_argument("--safebrowsing-disable-download-protection")
+            self.options = webdriver.ChromeOptions()
+            self.options.add_argument('--no-sandbox')
+            self.options.add_argument('--start-maximized')
+            self.options.add_argument('--output=/dev/null')
+            self.options.add_argument('--log-level=3')
+            self.options.add_argument("--disable-notifications")
+            self.options.add_argument("--disable-infobars")
+            self.options.add_argument("--safebrowsing-disable-download-protection")
             
-            WebScraping.options.add_argument("--disable-dev-shm-usage")
-            WebScraping.options.add_argument("--disable-renderer-backgrounding")
-            WebScraping.options.add_argument("--disable-background-timer-throttling")
-            WebScraping.options.add_argument("--disable-backgrounding-occluded-windows")
-            WebScraping.options.add_argument("--disable-client-side-phishing-detection")
-            WebScraping.options.add_argument("--disable-crash-reporter")
-            WebScraping.options.add_argument("--disable-oopr-debug-crash-dump")
-            WebScraping.options.add_argument("--no-crash-upload")
-            WebScraping.options.add_argument("--disable-gpu")
-            WebScraping.options.add_argument("--disable-extensions")
-            WebScraping.options.add_argument("--disable-low-res-tiling")
-            WebScraping.options.add_argument("--log-level=3")
-            WebScraping.options.add_argument("--silent")
+            self.options.add_argument("--disable-dev-shm-usage")
+            self.options.add_argument("--disable-renderer-backgrounding")
+            self.options.add_argument("--disable-background-timer-throttling")
+            self.options.add_argument("--disable-backgrounding-occluded-windows")
+            self.options.add_argument("--disable-client-side-phishing-detection")
+            self.options.add_argument("--disable-crash-reporter")
+            self.options.add_argument("--disable-oopr-debug-crash-dump")
+            self.options.add_argument("--no-crash-upload")
+            self.options.add_argument("--disable-gpu")
+            self.options.add_argument("--disable-extensions")
+            self.options.add_argument("--disable-low-res-tiling")
+            self.options.add_argument("--log-level=3")
+            self.options.add_argument("--silent")
             
             # Experimentals
             if self.__experimentals__:
-                WebScraping.options.add_experimental_option(
+                self.options.add_experimental_option(
                     'excludeSwitches', ['enable-logging', "enable-automation"])
-                WebScraping.options.add_experimental_option('useAutomationExtension', False)
+                self.options.add_experimental_option('useAutomationExtension', False)
 
             # screen size
-            WebScraping.options.add_argument(f"--window-size={self.__width__},{self.__height__}")
+            self.options.add_argument(f"--window-size={self.__width__},{self.__height__}")
             
             # headless mode
             if self.__headless__:
-                WebScraping.options.add_argument("--headless=new")
+                self.options.add_argument("--headless=new")
                 
             if self.__mute__:
-                WebScraping.options.add_argument("--mute-audio")
+                self.options.add_argument("--mute-audio")
                 
             # Set chrome folder
             if self.__chrome_folder__:
-                WebScraping.options.add_argument(f"--user-data-dir={self.__chrome_folder__}")
+                self.options.add_argument(f"--user-data-dir={self.__chrome_folder__}")
 
             # Set default user agent
             if self.__user_agent__:
-                WebScraping.options.add_argument(
+                self.options.add_argument(
                     '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36')
 
             if self.__download_folder__:
@@ -182,25 +211,30 @@ class WebScraping ():
                         'safebrowsing.enabled': True
                         }
 
-                WebScraping.options.add_experimental_option("prefs", prefs)
+                self.options.add_experimental_option("prefs", prefs)
 
             if self.__extensions__:
                 for extension in self.__extensions__:
-                    WebScraping.options.add_extension(extension)
+                    self.options.add_extension(extension)
 
             if self.__incognito__:
-                WebScraping.options.add_argument("--incognito")
+                self.options.add_argument("--incognito")
 
             if self.__experimentals__:
-                WebScraping.options.add_argument(
+                self.options.add_argument(
                     "--disable-blink-features=AutomationControlled")
 
+            # Enable CDP network events in performance logs
+            if self.__network_logs__:
+                self.options.set_capability(
+                    "goog:loggingPrefs", {"performance": "ALL"})
+
         # Set proxy without autentication
         if (self.__proxy_server__ and self.__proxy_port__
                 and not self.__proxy_user__ and not self.__proxy_pass__):
 
             proxy = f"{self.__proxy_server__}:{self.__proxy_port__}"
-            WebScraping.options.add_argument(f"--proxy-server={proxy}")
+            self.options.add_argument(f"--proxy-server={proxy}")
 
         # Set proxy with autentification
         # seleniumwire_options = {}
@@ -208,17 +242,118 @@ class WebScraping ():
                 and self.__proxy_user__ and self.__proxy_pass__):
             
             self.__create_proxy_extesion__()
-            WebScraping.options.add_extension(self.__pluginfile__)
+            self.options.add_extension(self.__pluginfile__)
+
+        # Autoinstall driver with selenium (own chromedriver for each instance:
+        # quit() stops the service, that can not be shared with other browsers)
+        self.service = Service()
 
-        # Autoinstall driver with selenium
-        if not WebScraping.service:
-            WebScraping.service = Service()
-            
         self.driver = webdriver.Chrome(
-            service=WebScraping.service,
-            options=WebScraping.options
+            service=self.service,
+            options=self.options
         )
 
+        # Count and time webdriver commands
+        if self.__profiler__:
+            self.__profiler__.attach(self.driver)
+
+        # Skip not required resources (images, fonts, trackers...)
+        if self.__blocked_urls__:
+            self.block_urls(self.__blocked_urls__)
+
+    def restart_browser(self):
+        """ Close chrome and open a new instance with the same options
+            and chrome data folder (frees the memory leaked by long runs)
+        """
+
+        # Browser could be already crashed
+        try:
+            self.end_browser()
+        except Exception:
+            pass
+
+        self.network_inflight = set()
+        self.network_last_activity = time.time()
+        self.network_clock_offset = None
+
+        self.__set_browser_instance__()
+        if self.__time_out__ > 0:
+            self.driver.set_page_load_timeout(self.__time_out__)
+
+    def get_memory(self) -> dict:
+        """ Get memory used by chrome: rss of all its processes (requires
+            psutil) and js heap of the current tab (with CDP)
+
+        Returns:
+            dict: memory in MB
+
+            Structure:
+            {
+                "rss_mb": float (None without psutil),
+                "heap_mb": float,
+            }
+        """
+
+        self.driver.execute_cdp_cmd("Performance.enable", {})
+        metrics = self.driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+        metrics = {metric["name"]: metric["value"] for metric in metrics}
+        heap_mb = metrics.get("JSHeapUsedSize", 0) / 1024 / 1024
+
+        rss_mb = None
+        if psutil:
+            rss = 0
+            for process in self.__get_chrome_processes__():
+                try:
+                    rss += process.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            rss_mb = round(rss / 1024 / 1024, 2)
+
+        return {
+            "rss_mb": rss_mb,
+            "heap_mb": round(heap_mb, 2),
+        }
+
+    def __get_chrome_processes__(self) -> list:
+        """ Get chrome processes of this instance (browser, renderers, gpu...)
+
+        Returns:
+            list: psutil processes
+        """
+
+        # Browser started with the chrome folder, or by the chromedriver
+        if self.__chrome_folder__:
+            folder_arg = f"--user-data-dir={self.__chrome_folder__}"
+            roots = [
+                process for process in psutil.process_iter(["cmdline"])
+                if folder_arg in (process.info["cmdline"] or [])
+            ]
+        else:
+            roots = [psutil.Process(self.service.process.pid)]
+
+        processes = {}
+        for root in roots:
+            try:
+                for process in [root] + root.children(recursive=True):
+                    processes[process.pid] = process
+            except psutil.NoSuchProcess:
+                continue
+
+        return list(processes.values())
+
+    def block_urls(self, urls:list):
+        """ Block requests to urls (with CDP). Applied to the current tab,
+            and again to each tab selected with switch_to_tab
+
+        Args:
+            urls (list): url patterns with * wildcards, like "*.png" or "*intercom.io*".
+                Empty list to unblock all
+        """
+
+        self.__blocked_urls__ = urls
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": urls})
+
     def __create_proxy_extesion__(self):
         """Create a proxy chrome extension"""
 
@@ -392,6 +527,185 @@ class WebScraping ():
                 raise Exception(
                     "Time out exeded. The element {} is until in the page".format(selector))
 
+    def __poll_network_log__(self):
+        """ Read chrome performance logs and update the requests in flight """
+
+        if not self.__network_logs__:
+            return
+
+        try:
+            entries = self.driver.get_log("performance")
+        except:
+            return
+
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            method = message.get("method", "")
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+
+            # Offset from chrome monotonic clock to wall clock
+            if "wallTime" in params and "timestamp" in params:
+                self.network_clock_offset = params["wallTime"] - params["timestamp"]
+
+            # Track requests start and end (ignore long living connections)
+            if method == "Network.requestWillBeSent":
+                if params.get("type") in ["WebSocket", "EventSource"]:
+                    continue
+                self.network_inflight.add(request_id)
+            elif method in ["Network.loadingFinished", "Network.loadingFailed"]:
+                self.network_inflight.discard(request_id)
+            else:
+                continue
+
+            # Event time (not poll time: old buffered events do not restart
+            # the idle window)
+            if "timestamp" in params and self.network_clock_offset is not None:
+                event_time = params["timestamp"] + self.network_clock_offset
+            else:
+                event_time = entry["timestamp"] / 1000
+            event_time = min(event_time, time.time())
+            self.network_last_activity = max(self.network_last_activity, event_time)
+
+    def wait_selector(self, selector:str, time_out:float=10) -> bool:
+        """ Wait until an element is in the page
+
+        Args:
+            selector (str): css selector of the element
+            time_out (float, optional): max seconds to wait. Defaults to 10.
+
+        Returns:
+            bool: True if the element was found before time out
+        """
+
+        try:
+            WebDriverWait(self.driver, time_out, poll_frequency=0.1).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+        except TimeoutException:
+            return False
+
+        return True
+
+    def wait_network_idle(self, idle_time:float=0.5, time_out:float=10) -> bool:
+        """ Wait until there are no requests in flight (requires network_logs)
+
+        Args:
+            idle_time (float, optional): seconds without network activity. Defaults to 0.5.
+            time_out (float, optional): max seconds to wait. Defaults to 10.
+
+        Returns:
+            bool: True if the network was idle before time out
+        """
+
+        if not self.__network_logs__:
+            return True
+
+        end_time = time.time() + time_out
+        while time.time() < end_time:
+            self.__poll_network_log__()
+            idle = time.time() - self.network_last_activity
+            if not self.network_inflight and idle >= idle_time:
+                return True
+            time.sleep(0.1)
+
+        # Forget requests that never ended (long polling, trackers...)
+        self.network_inflight.clear()
+        return False
+
+    def wait_dom_stable(self, quiet_time:float=0.5, time_out:float=10) -> bool:
+        """ Wait until the page stops changing (MutationObserver)
+
+        Args:
+            quiet_time (float, optional): seconds without dom mutations. Defaults to 0.5.
+            time_out (float, optional): max seconds to wait. Defaults to 10.
+
+        Returns:
+            bool: True if the dom was stable before time out
+        """
+
+        # Restore the previous script timeout after waiting
+        previous_timeout = self.driver.timeouts.script
+        self.driver.set_script_timeout(time_out + 5)
+        try:
+            return self.driver.execute_async_script("""
+                const [quietMs, timeoutMs, done] = arguments
+                let ended = false
+                let quietTimer = null
+                let observer = null
+                const finish = (stable) => {
+                    if (ended) return
+                    ended = true
+                    if (observer) observer.disconnect()
+                    clearTimeout(quietTimer)
+                    clearTimeout(timeoutTimer)
+                    done(stable)
+                }
+                const timeoutTimer = setTimeout(finish, timeoutMs, false)
+                observer = new MutationObserver(() => {
+                    clearTimeout(quietTimer)
+                    quietTimer = setTimeout(finish, quietMs, true)
+                })
+                observer.observe(document, {
+                    childList: true,
+                    subtree: true,
+                    attributes: true,
+                    characterData: true,
+                })
+                quietTimer = setTimeout(finish, quietMs, true)
+            """, int(quiet_time * 1000), int(time_out * 1000))
+        finally:
+            self.driver.set_script_timeout(previous_timeout)
+
+    def wait_ready(self, selector:str="", time_out:float=10, quiet_time:float=0.5,
+                   network_idle:bool=True, dom_stable:bool=True) -> bool:
+        """ Wait until the page is ready: selector found, network idle
+            and dom stable. Wait times are added to wait_stats
+
+        Args:
+            selector (str, optional): css selector to wait for. Defaults to "".
+            time_out (float, optional): max seconds to wait (for all signals). Defaults to 10.
+            quiet_time (float, optional): seconds without network or dom activity. Defaults to 0.5.
+            network_idle (bool, optional): wait network idle. Defaults to True.
+            dom_stable (bool, optional): wait dom stable. Defaults to True.
+
+        Returns:
+            bool: True if all signals were ready before time out
+        """
+
+        signals = []
+        if selector:
+            signals.append(("selector", lambda remaining: self.wait_selector(
+                selector, remaining)))
+        if network_idle:
+            signals.append(("network", lambda remaining: self.wait_network_idle(
+                quiet_time, remaining)))
+        if dom_stable:
+            signals.append(("dom", lambda remaining: self.wait_dom_stable(
+                quiet_time, remaining)))
+
+        end_time = time.time() + time_out
+        all_ready = True
+        for signal, wait in signals:
+
+            # Wait signal with the remaining time
+            start_time = time.time()
+            remaining = max(end_time - start_time, 0.1)
+            ready = wait(remaining)
+            all_ready = all_ready and ready
+
+            # Add wait time to the signal totals
+            stats = self.wait_stats.setdefault(signal, {
+                "count": 0,
+                "seconds": 0,
+                "not_ready": 0,
+            })
+            stats["count"] += 1
+            stats["seconds"] += time.time() - start_time
+            if not ready:
+                stats["not_ready"] += 1
+
+        return all_ready
+
     def get_text(self, selector):
         """
         Return text for specific element in the page
@@ -613,6 +927,10 @@ class WebScraping ():
         windows = self.driver.window_handles
         self.driver.switch_to.window(windows[number])
 
+        # Blocked urls are set by tab
+        if self.__blocked_urls__:
+            self.block_urls(self.__blocked_urls__)
+
     def refresh_selenium(self, time_units=1, back_tab=0):
         """
         Refresh the selenium data, creating and closing a new tab
@@ -0,0 +1,189 @@
+import os
+import json
+import threading
+from time import perf_counter
+from datetime import datetime
+from contextlib import contextmanager
+from dotenv import load_dotenv
+load_dotenv()
+
+TIMING = os.getenv("TIMING") == "True"
+
+
+class Timer ():
+
+    def __init__(self, enabled: bool = False):
+        """ Record time, webdriver commands and sql statements of each
+            step of the run (spans). Does nothing when disabled
+
+        Args:
+            enabled (bool, optional): record spans. Defaults to False.
+        """
+
+        self.enabled = enabled
+        self.started = datetime.now().replace(microsecond=0)
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def count_commands(self, driver):
+        """ Count the commands sent to a webdriver (in driver.commands_count)
+
+        Args:
+            driver (webdriver.Chrome): selenium driver
+        """
+
+        if not self.enabled or hasattr(driver, "commands_count"):
+            return
+
+        driver.commands_count = 0
+        execute = driver.execute
+
+        def execute_counted(*args, **kwargs):
+            driver.commands_count += 1
+            return execute(*args, **kwargs)
+
+        driver.execute = execute_counted
+
+    @contextmanager
+    def span(self, ticker: str, name: str, driver=None, database=None):
+        """ Record a step of the run
+
+        Args:
+            ticker (str): ticker name
+            name (str): step name, like "load_company" or "save_news_data"
+            driver (webdriver.Chrome, optional): driver to count commands.
+                Defaults to None.
+            database (MySQL, optional): database to count statements.
+                Defaults to None.
+
+        Usage:
+            with timer.span(ticker, "get_news_data", scraper.driver):
+                ...
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        commands_start = getattr(driver, "commands_count", 0)
+        statements_start = getattr(database, "statements_count", 0)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            span = {
+                "ticker": ticker,
+                "name": name,
+                "seconds": round(perf_counter() - start, 4),
+                "commands": getattr(driver, "commands_count", 0) - commands_start,
+                "statements": getattr(database, "statements_count", 0) - statements_start,
+                "thread": threading.current_thread().name,
+            }
+            with self.lock:
+                self.spans.append(span)
+
+    def __get_percentile__(self, values: list, percentile: float) -> float:
+        """ Get percentile of sorted values (nearest rank)
+
+        Args:
+            values (list): sorted values
+            percentile (float): percentile, from 0 to 100
+
+        Returns:
+            float: value
+        """
+
+        index = max(0, int(round(percentile / 100 * len(values))) - 1)
+        return values[index]
+
+    def get_summary(self) -> dict:
+        """ Get time and counters summary of each step
+
+        Returns:
+            dict: summary by step name
+
+            Structure:
+            {
+                "str (step name)": {
+                    "count": int,
+                    "total": float,
+                    "p50": float,
+                    "p95": float,
+                    "max": float,
+                    "commands": int,
+                    "statements": int,
+                },
+                ...
+            }
+        """
+
+        with self.lock:
+            spans = list(self.spans)
+
+        spans_by_name = {}
+        for span in spans:
+            spans_by_name.setdefault(span["name"], []).append(span)
+
+        summary = {}
+        for name, name_spans in spans_by_name.items():
+            seconds = sorted(span["seconds"] for span in name_spans)
+            summary[name] = {
+                "count": len(seconds),
+                "total": round(sum(seconds), 4),
+                "p50": self.__get_percentile__(seconds, 50),
+                "p95": self.__get_percentile__(seconds, 95),
+                "max": seconds[-1],
+                "commands": sum(span["commands"] for span in name_spans),
+                "statements": sum(span["statements"] for span in name_spans),
+            }
+
+        return summary
+
+    def save_report(self, folder: str) -> str:
+        """ Save spans and summary of the run in a json file
+
+        Args:
+            folder (str): reports folder path
+
+        Returns:
+            str: report file path (None when disabled)
+        """
+
+        if not self.enabled:
+            return None
+
+        os.makedirs(folder, exist_ok=True)
+        file_name = f"run_{self.started.strftime('%Y%m%d_%H%M%S')}.json"
+        file_path = os.path.join(folder, file_name)
+
+        with self.lock:
+            spans = list(self.spans)
+
+        report = {
+            "started": str(self.started),
+            "summary": self.get_summary(),
+            "spans": spans,
+        }
+        with open(file_path, "w") as file:
+            json.dump(report, file, indent=4)
+
+        return file_path
+
+    def log_summary(self, logger):
+        """ Show summary of each step
+
+        Args:
+            logger (logging.Logger): logger instance
+        """
+
+        if not self.enabled:
+            return
+
+        for name, step in self.get_summary().items():
+            logger.info(f"{name}: {step['count']} x, p50 {step['p50']}s, "
+                        f"p95 {step['p95']}s, max {step['max']}s, "
+                        f"{step['commands']} commands, {step['statements']} sql")
+
+
+# Shared timer of the run
+timer = Timer(TIMING)